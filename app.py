@@ -2,13 +2,23 @@ import logging
 import os
 import threading
 import time
+from contextlib import asynccontextmanager
 from jose import JWTError, jwt
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
-from models.database import init_db
-from routers import auth, questions, users, webhook, config_router, submit_form
+from models.database import init_db, async_engine
+from routers import auth, questions, users, webhook, config_router, submit_form, metrics
 from services.auth_service import decode_token
+from services.twilio_transport import twilio_transport
+from services.broadcast_service import broadcast_engine
+from services.reply_writer import reply_writer
+from services.outbox import outbox
+from services.password_hasher import password_hasher
+from services.recaptcha_verifier import recaptcha_verifier
+from services.config_store import config_store
+from services.logging_pipeline import setup_logging
+from services.metrics import MetricsMiddleware
 
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
@@ -19,36 +29,33 @@ LOG_DIR = "logs"
 if not os.path.exists(LOG_DIR):
     os.makedirs(LOG_DIR)
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler(os.path.join(LOG_DIR, "app.log"))
-    ]
-)
+# Records are queued and written (rotated, redacted, JSON by default) on a listener thread
+log_listener = setup_logging(LOG_DIR)
 
 logger = logging.getLogger(__name__)
 
 # Load .env
 load_dotenv()
 
+# Apply pending migrations on startup; disable when deploys run `alembic upgrade head`
+DB_AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", "true").lower() in ("1", "true", "yes")
+
 
 # Watcher Class
 class DotEnvChangeHandler(FileSystemEventHandler):
     def on_modified(self, event):
         if event.src_path.endswith(".env"):
-            logger.info(".env file changed, reloading environment variables...")
+            logger.info(".env file changed, reloading configuration snapshot...")
             time.sleep(0.2)  # Wait for file write to finish
             try:
-                load_dotenv(override=True)
+                config_store.reload()
             except PermissionError:
                 logger.warning("Permission denied when reading .env, retrying...")
                 time.sleep(0.5)
                 try:
-                    load_dotenv(override=True)
+                    config_store.reload()
                 except Exception as e:
-                    logger.error(f"Failed to reload .env: {e}")
+                    logger.error("Failed to reload .env: %s", e)
 
 
 def start_env_watcher():
@@ -70,8 +77,30 @@ def start_env_watcher():
     thread.start()
 
 
+# Application lifespan
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if DB_AUTO_MIGRATE:
+        logger.info("Initializing database...")
+        init_db()
+        logger.info("Database initialized successfully.")
+    await reply_writer.start()
+    await outbox.start()
+    await broadcast_engine.start()
+    yield
+    await broadcast_engine.stop()
+    await reply_writer.stop()
+    await outbox.stop()
+    logger.info("Shutting down, closing Twilio and database connections...")
+    await twilio_transport.close()
+    await recaptcha_verifier.close()
+    password_hasher.close()
+    await async_engine.dispose()
+    log_listener.stop()
+
+
 # FastAPI App Setup
-app = FastAPI(redirect_slashes=False)
+app = FastAPI(redirect_slashes=False, lifespan=lifespan)
 
 origins = [
     "https://admin.myadvisor.sg",
@@ -85,6 +114,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Outermost, so request latency includes CORS handling
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(auth.router)
 app.include_router(submit_form.router)
@@ -106,12 +137,10 @@ app.include_router(
     config_router.router,
     dependencies=[Depends(decode_token)]
 )
+# Scraped by Prometheus; guarded by METRICS_TOKEN instead of advisor tokens
+app.include_router(metrics.router)
 
-# Init DB and Start Watcher
-logger.info("Initializing database...")
-init_db()
-logger.info("Database initialized successfully.")
-
+# Start Watcher
 start_env_watcher()
 
 if __name__ == "__main__":
@@ -0,0 +1,110 @@
+"""
+Caller-side logging cost of one webhook request: logging on vs off.
+
+Replays the log calls a mid-questionnaire /webhook request makes
+(received, processed, stored reply, advanced step, plus a debug line)
+and reports the per-request latency they add on the request thread:
+  * "off": LOG_LEVEL=WARNING, nothing is emitted;
+  * "sync": the previous setup, i.e. f-strings, a dump of the Twilio
+    form dict, and synchronous StreamHandler + FileHandler writes;
+  * "pipeline": lazy %-formatting into setup_logging()'s queue, with
+    redaction and JSON encoding done on the listener thread.
+Output goes to a temporary directory; stderr is discarded.
+
+    python -m benchmarks.bench_logging_webhook --requests 20000
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from services.logging_pipeline import setup_logging
+
+FORM = {
+    "SmsMessageSid": "SM" + "0" * 32, "NumMedia": "0", "ProfileName": "Jane", "MessageType": "text",
+    "SmsSid": "SM" + "0" * 32, "WaId": "6591234567", "SmsStatus": "received", "Body": "Yes",
+    "To": "whatsapp:+6560000000", "NumSegments": "1", "ReferralNumMedia": "0",
+    "MessageSid": "SM" + "0" * 32, "AccountSid": "AC" + "0" * 32, "From": "whatsapp:+6591234567",
+    "ApiVersion": "2010-04-01",
+}
+
+logger = logging.getLogger("services.messaging_service")
+
+
+def request_fstrings(i):
+    from_number, msg = FORM["From"].replace("whatsapp:", ""), FORM["Body"].lower()
+    logger.info("Received webhook request")
+    logger.info(f"Received form data: {dict(FORM)}")
+    logger.info(f"Processed webhook message from {from_number}: {msg}")
+    logger.debug(f"Fetching question for advisor_id: {7}, step: {i % 10}")
+    logger.info(f"Stored reply from {from_number} for question {i}")
+    logger.info(f"Advanced to step {i % 10 + 1} for {from_number}")
+
+
+def request_lazy(i):
+    from_number, msg = FORM["From"].replace("whatsapp:", ""), FORM["Body"].lower()
+    logger.info("Received webhook request")
+    logger.info("Processed webhook message from %s", from_number)
+    logger.debug("Webhook message body from %s: %s", from_number, msg)
+    logger.debug("Fetching question for advisor_id: %s, step: %s", 7, i % 10)
+    logger.info("Stored reply from %s for question %s", from_number, i)
+    logger.info("Advanced to step %s for %s", i % 10 + 1, from_number)
+
+
+def measure(fn, requests):
+    samples = []
+    for i in range(requests):
+        start = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.99)], sum(samples) / 1e6
+
+
+def reset_root():
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    log_dir = tempfile.mkdtemp(prefix="bench-logs-")
+    sys.stderr = open(os.devnull, "w")
+    rows = []
+
+    reset_root()
+    logging.getLogger().setLevel(logging.WARNING)
+    rows.append(("off", *measure(request_lazy, args.requests)))
+
+    reset_root()
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        handlers=[logging.StreamHandler(), logging.FileHandler(os.path.join(log_dir, "sync.log"))],
+    )
+    rows.append(("sync", *measure(request_fstrings, args.requests)))
+
+    reset_root()
+    listener = setup_logging(log_dir, level="INFO", fmt="json")
+    drain_start = time.perf_counter()
+    rows.append(("pipeline", *measure(request_lazy, args.requests)))
+    listener.stop()
+    drained = time.perf_counter() - drain_start
+
+    sys.stderr = sys.__stderr__
+    print(f"{'mode':<10} {'p50 us':>8} {'p99 us':>8} {'total s':>8}")
+    for label, p50, p99, total in rows:
+        print(f"{label:<10} {p50:>8.1f} {p99:>8.1f} {total:>8.3f}")
+    print(f"pipeline listener finished writing after {drained:.3f} s; logs in {log_dir}")
+
+
+if __name__ == "__main__":
+    main()
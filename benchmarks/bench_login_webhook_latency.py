@@ -0,0 +1,92 @@
+"""
+/webhook latency while /login is under load.
+
+Runs against a live server (uvicorn app:app). A steady stream of /webhook
+posts is measured twice: once on an idle server and once while
+--login-concurrency clients hammer /login with a real advisor's
+credentials. Before the hashing pool, every password check ran on the
+event loop and the second p99 grew with the login load. 503s from the
+pool's queue timeout are counted, not treated as errors.
+
+    python -m benchmarks.bench_login_webhook_latency --base-url http://127.0.0.1:8000 \\
+        --email advisor@example.com --password secret --seconds 10
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from collections import Counter
+
+import aiohttp
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def webhook_load(http, base_url, rate, seconds, from_number):
+    latencies = []
+    interval = 1.0 / rate
+    deadline = time.monotonic() + seconds
+
+    async def one():
+        start = time.perf_counter()
+        async with http.post(f"{base_url}/webhook", data={"From": from_number, "Body": "hi"}) as response:
+            await response.read()
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    tasks = []
+    while time.monotonic() < deadline:
+        tasks.append(asyncio.create_task(one()))
+        await asyncio.sleep(interval)
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return latencies
+
+
+async def login_load(http, base_url, email, password, concurrency, stop: asyncio.Event):
+    statuses = Counter()
+
+    async def client():
+        while not stop.is_set():
+            async with http.post(f"{base_url}/login", json={"email": email, "password": password}) as response:
+                await response.read()
+                statuses[response.status] += 1
+
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return statuses
+
+
+async def run(args):
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0)) as http:
+        rows = []
+        for label, logins in (("idle", 0), ("login load", args.login_concurrency)):
+            stop = asyncio.Event()
+            login_task = asyncio.create_task(
+                login_load(http, args.base_url, args.email, args.password, logins, stop)
+            )
+            latencies = await webhook_load(http, args.base_url, args.rate, args.seconds, args.from_number)
+            stop.set()
+            statuses = await login_task
+            rows.append((label, latencies, statuses))
+
+    print(f"{'scenario':<12} {'requests':>9} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}  logins")
+    for label, latencies, statuses in rows:
+        print(f"{label:<12} {len(latencies):>9} {statistics.median(latencies):>8.1f} "
+              f"{percentile(latencies, 99):>8.1f} {max(latencies):>8.1f}  {dict(statuses)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--from-number", default="+6580000000")
+    parser.add_argument("--rate", type=int, default=50, help="webhook requests per second")
+    parser.add_argument("--login-concurrency", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=10)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
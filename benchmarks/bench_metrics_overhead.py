@@ -0,0 +1,113 @@
+"""
+Recording cost of the /metrics instrumentation.
+
+Reports, in nanoseconds per operation:
+  * Histogram.observe() and Counter.inc() from one thread and from several
+    threads contending for the same series (the webhook threadpool case);
+  * MetricsMiddleware around a trivial ASGI app, against the bare app;
+  * REGISTRY.render() after the histograms hold a realistic label set.
+Stdlib only; no database, Twilio or HTTP server involved.
+
+    python -m benchmarks.bench_metrics_overhead --ops 200000 --threads 8
+"""
+import argparse
+import asyncio
+import threading
+import time
+
+from services.metrics import REGISTRY, Counter, Histogram, MetricsMiddleware
+
+
+def per_op_ns(fn, ops):
+    start = time.perf_counter()
+    fn(ops)
+    return (time.perf_counter() - start) / ops * 1e9
+
+
+def threaded_ns(fn, ops, threads):
+    per_thread = ops // threads
+    workers = [threading.Thread(target=fn, args=(per_thread,)) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return (time.perf_counter() - start) / (per_thread * threads) * 1e9
+
+
+async def bare_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def webhook_endpoint():
+    pass
+
+
+webhook_endpoint.__module__ = "routers.webhook"
+
+
+async def routed_app(scope, receive, send):
+    scope["endpoint"] = webhook_endpoint
+    await bare_app(scope, receive, send)
+
+
+async def drive(app, ops):
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for _ in range(ops):
+        await app({"type": "http", "method": "POST", "path": "/webhook"}, receive, send)
+    return (time.perf_counter() - start) / ops * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ops", type=int, default=200000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    histogram = Histogram("bench_seconds", "bench", ("router", "method", "status"))
+    counter = Counter("bench_total", "bench", ("reason",))
+
+    def observe(n):
+        for i in range(n):
+            histogram.observe(0.004, "webhook", "POST", "2xx")
+
+    def inc(n):
+        for i in range(n):
+            counter.inc("network")
+
+    def baseline(n):
+        for i in range(n):
+            pass
+
+    loop_ns = per_op_ns(baseline, args.ops)
+    rows = [
+        ("observe, 1 thread", per_op_ns(observe, args.ops) - loop_ns),
+        (f"observe, {args.threads} threads", threaded_ns(observe, args.ops, args.threads) - loop_ns),
+        ("inc, 1 thread", per_op_ns(inc, args.ops) - loop_ns),
+        (f"inc, {args.threads} threads", threaded_ns(inc, args.ops, args.threads) - loop_ns),
+    ]
+
+    bare = asyncio.run(drive(routed_app, args.ops))
+    wrapped = asyncio.run(drive(MetricsMiddleware(routed_app), args.ops))
+    rows.append(("ASGI request, bare", bare))
+    rows.append(("ASGI request, middleware", wrapped))
+    rows.append(("middleware overhead", wrapped - bare))
+
+    print(f"{'operation':<28} {'ns/op':>10}")
+    for label, ns in rows:
+        print(f"{label:<28} {ns:>10.0f}")
+
+    start = time.perf_counter()
+    body = REGISTRY.render()
+    print(f"render: {(time.perf_counter() - start) * 1000:.2f} ms for {len(body.splitlines())} lines")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+500-question tree: bulk import vs. one POST /questions/add per question.
+
+Runs both paths at the service layer against DATABASE_URL for a scratch
+advisor and removes everything it created afterwards.
+
+    python -m benchmarks.bench_question_import --questions 500
+"""
+import argparse
+import time
+
+from sqlalchemy import delete
+
+from models.database import SessionLocal, init_db, FinancialAdvisor, DecisionTreeQuestion
+from services.question_service import add_question, import_question_tree
+
+
+def tree(size: int):
+    return [
+        {"question": f"Bench question {i}?", "triggerKeyword": "yes" if i % 5 == 0 else None,
+         "is_predefined_answer": i % 5 == 0}
+        for i in range(1, size + 1)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=500)
+    args = parser.parse_args()
+
+    init_db()
+    with SessionLocal() as db:
+        advisor = FinancialAdvisor(name="Bench Advisor", email=f"bench-{time.time_ns()}@example.invalid",
+                                   password="!")
+        db.add(advisor)
+        db.commit()
+        advisor_id = advisor.id
+
+    questions = tree(args.questions)
+    try:
+        with SessionLocal() as db:
+            start = time.perf_counter()
+            for q in questions:
+                add_question(db, advisor_id, q["question"], q["triggerKeyword"], q["is_predefined_answer"])
+            per_question = time.perf_counter() - start
+
+        with SessionLocal() as db:
+            start = time.perf_counter()
+            import_question_tree(db, advisor_id, questions, replace=True)
+            bulk = time.perf_counter() - start
+
+        print(f"{'path':<14} {'ms':>10} {'ms/question':>12}")
+        print(f"{'per-question':<14} {per_question * 1000:>10.1f} {per_question * 1000 / len(questions):>12.3f}")
+        print(f"{'bulk import':<14} {bulk * 1000:>10.1f} {bulk * 1000 / len(questions):>12.3f}")
+        print(f"speedup: {per_question / bulk:.1f}x")
+    finally:
+        with SessionLocal() as db:
+            db.execute(delete(DecisionTreeQuestion).where(DecisionTreeQuestion.advisor_id == advisor_id))
+            db.execute(delete(FinancialAdvisor).where(FinancialAdvisor.id == advisor_id))
+            db.commit()
+
+
+if __name__ == "__main__":
+    main()
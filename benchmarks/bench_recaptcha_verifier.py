@@ -0,0 +1,77 @@
+"""
+reCAPTCHA verification: blocking requests.post vs. the pooled async verifier.
+
+Starts the fake siteverify server in-process and runs three scenarios:
+  * "requests": asyncio.to_thread + requests.post with a fresh connection
+    per call, the way verify_recaptcha used to work;
+  * "pooled": RecaptchaVerifier on a keep-alive pool, unique tokens;
+  * "retries": the same tokens again, served from the verdict cache.
+It then makes the server slower than the verifier's timeout and reports
+how quickly the breaker opens and how fast verify() answers afterwards.
+
+    python -m benchmarks.bench_recaptcha_verifier --requests 500 --latency-ms 20
+"""
+import argparse
+import asyncio
+import time
+
+import requests
+
+from benchmarks.fake_recaptcha_server import start_fake_recaptcha
+from services.recaptcha_verifier import CircuitBreaker, RecaptchaVerifier
+
+
+async def timed(label, coros):
+    start = time.perf_counter()
+    results = await asyncio.gather(*coros)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<10} {len(results):>8} {elapsed:>9.3f} {elapsed / len(results) * 1000:>10.2f}")
+    return results
+
+
+def blocking_verify(url, token):
+    response = requests.post(url, data={"secret": "secret", "response": token}, timeout=5)
+    response.raise_for_status()
+    return response.json().get("success", False)
+
+
+async def run(args):
+    runner, app, url = await start_fake_recaptcha(latency_ms=args.latency_ms)
+    verifier = RecaptchaVerifier("secret", url, timeout=0.5, fail_open=args.fail_open,
+                                 breaker=CircuitBreaker(failure_threshold=5, reset_timeout=30))
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def bounded(coro_fn, *fn_args):
+        async with semaphore:
+            return await coro_fn(*fn_args)
+
+    tokens = [f"token-{i}" for i in range(args.requests)]
+    try:
+        print(f"{'scenario':<10} {'requests':>8} {'total s':>9} {'ms/verify':>10}")
+        await timed("requests", [bounded(asyncio.to_thread, blocking_verify, url, t) for t in tokens])
+        await timed("pooled", [bounded(verifier.verify, t) for t in tokens])
+        await timed("retries", [bounded(verifier.verify, t) for t in tokens])
+
+        app["latency_ms"] = 1000  # slower than the verifier's 0.5s timeout
+        slow_tokens = [f"slow-{i}" for i in range(args.requests)]
+        results = await timed("degraded", [bounded(verifier.verify, t) for t in slow_tokens])
+        print(f"breaker: {verifier.breaker.state}, verdicts while degraded: "
+              f"{sum(results)} accepted / {len(results) - sum(results)} rejected "
+              f"({'fail-open' if args.fail_open else 'fail-closed'})")
+        print(f"stats: {verifier.stats()}")
+    finally:
+        await verifier.close()
+        await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--fail-open", action="store_true")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
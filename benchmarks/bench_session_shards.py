@@ -0,0 +1,87 @@
+"""
+SessionManager lock-contention benchmark across shard counts.
+
+Many OS threads (like FastAPI's sync-route threadpool) and many asyncio
+tasks spread over several event-loop threads hammer get_session/set_session
+with random phone numbers. Throughput is reported per shard count.
+
+    python -m benchmarks.bench_session_shards --shards 1 4 16 64
+"""
+import argparse
+import asyncio
+import random
+import threading
+import time
+
+from services.session_manager import SessionManager
+from services.session_store import MemorySessionStore, ShardedSessionStore
+
+KEYSPACE = 100_000
+
+
+def make_manager(shards: int) -> SessionManager:
+    store = MemorySessionStore() if shards == 1 else ShardedSessionStore(shards)
+    return SessionManager(store=store)
+
+
+def hammer(manager: SessionManager, ops: int, seed: int):
+    rng = random.Random(seed)
+    for _ in range(ops):
+        number = f"+65{rng.randrange(KEYSPACE):08d}"
+        session = manager.get_session(number)
+        if session is None or rng.random() < 0.5:
+            manager.set_session(number, {"current_step": 1, "advisor_id": 1})
+
+
+def run_threads(manager: SessionManager, threads: int, ops: int) -> float:
+    workers = [threading.Thread(target=hammer, args=(manager, ops, i)) for i in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return threads * ops / (time.perf_counter() - start)
+
+
+def run_tasks(manager: SessionManager, loops: int, tasks: int, ops: int) -> float:
+    async def task(seed):
+        rng = random.Random(seed)
+        for i in range(ops):
+            number = f"+65{rng.randrange(KEYSPACE):08d}"
+            if manager.get_session(number) is None or rng.random() < 0.5:
+                manager.set_session(number, {"current_step": 1, "advisor_id": 1})
+            if i % 50 == 0:
+                await asyncio.sleep(0)
+
+    def loop_main(offset):
+        async def main():
+            await asyncio.gather(*(task(offset + i) for i in range(tasks)))
+        asyncio.run(main())
+
+    workers = [threading.Thread(target=loop_main, args=(i * tasks,)) for i in range(loops)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return loops * tasks * ops / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--loops", type=int, default=4)
+    parser.add_argument("--tasks", type=int, default=250)
+    parser.add_argument("--ops", type=int, default=20_000, help="operations per thread")
+    args = parser.parse_args()
+
+    print(f"{'shards':>6} {'threads ops/s':>14} {'tasks ops/s':>12}")
+    for shards in args.shards:
+        threads_rate = run_threads(make_manager(shards), args.threads, args.ops)
+        tasks_rate = run_tasks(make_manager(shards), args.loops, args.tasks, max(args.ops // 50, 1))
+        print(f"{shards:>6} {threads_rate:>14,.0f} {tasks_rate:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Outbound Twilio throughput: pooled async transport vs. a thread per send.
+
+Starts the fake Twilio server in-process and sends N messages through
+  * "to_thread": asyncio.to_thread + a blocking requests call, the way
+    send_message used twilio.rest.Client;
+  * "transport": TwilioTransport on a shared aiohttp keep-alive pool,
+    at each of the requested connection limits.
+
+    python -m benchmarks.bench_twilio_transport --messages 2000 --latency-ms 80
+"""
+import argparse
+import asyncio
+import time
+
+import requests
+
+from benchmarks.fake_twilio_server import start_fake_twilio
+from services.twilio_transport import TwilioTransport
+
+ACCOUNT_SID = "AC00000000000000000000000000000000"
+
+
+async def bench_to_thread(base_url: str, messages: int, concurrency: int) -> float:
+    http = requests.Session()
+    url = f"{base_url}/2010-04-01/Accounts/{ACCOUNT_SID}/Messages.json"
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def send(i):
+        async with semaphore:
+            response = await asyncio.to_thread(
+                http.post, url, data={"To": f"whatsapp:+6580000{i:04d}"}, auth=(ACCOUNT_SID, "token")
+            )
+            response.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(send(i) for i in range(messages)))
+    return messages / (time.perf_counter() - start)
+
+
+async def bench_transport(base_url: str, messages: int, concurrency: int, max_connections: int) -> float:
+    transport = TwilioTransport(ACCOUNT_SID, "token", base_url=base_url, max_connections=max_connections)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def send(i):
+        async with semaphore:
+            await transport.send_message(to=f"whatsapp:+6580000{i:04d}", from_="whatsapp:+6590000000")
+
+    try:
+        start = time.perf_counter()
+        await asyncio.gather(*(send(i) for i in range(messages)))
+        return messages / (time.perf_counter() - start)
+    finally:
+        await transport.close()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=80.0, help="simulated Twilio response time")
+    parser.add_argument("--connections", type=int, nargs="+", default=[10, 50, 100, 200])
+    args = parser.parse_args()
+
+    runner, base_url = await start_fake_twilio(latency_ms=args.latency_ms)
+    try:
+        rate = await bench_to_thread(base_url, args.messages, args.concurrency)
+        print(f"{'to_thread':<22} {rate:>10.1f} msg/s")
+        for limit in args.connections:
+            rate = await bench_transport(base_url, args.messages, args.concurrency, limit)
+            print(f"{f'transport ({limit} conns)':<22} {rate:>10.1f} msg/s")
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,117 @@
+"""
+Latency and peak Python memory for listing an advisor's users.
+
+Seeds N users for a scratch advisor in the database at DATABASE_URL, then
+measures, per size:
+  * "all":    get_users + UserResponse.model_validate per row (old route)
+  * "page":   first keyset page via get_users_page
+  * "walk":   every page via get_users_page, following next_cursor
+  * "ndjson": the full iter_users_ndjson stream
+Seeded rows are removed afterwards.
+
+    python -m benchmarks.bench_users_listing --sizes 10000 100000 1000000
+"""
+import argparse
+import time
+import tracemalloc
+from datetime import datetime, timezone, timedelta
+
+from sqlalchemy import insert, delete
+
+from models.database import SessionLocal, init_db, FinancialAdvisor, User
+from models.user_model import UserResponse
+from services.user_service import get_users, get_users_page, iter_users_ndjson, USERS_PAGE_MAX_LIMIT
+
+SEED_CHUNK = 5000
+
+
+def seed(advisor_id: int, count: int):
+    base = datetime.now(timezone.utc) - timedelta(days=365)
+    with SessionLocal() as db:
+        for start in range(0, count, SEED_CHUNK):
+            db.execute(insert(User), [
+                {
+                    "salutation": "Mr",
+                    "name": f"Bench User {i}",
+                    "mobile_number": f"+99{advisor_id:04d}{i:08d}",
+                    "email": f"bench{advisor_id}.{i}@example.invalid",
+                    "advisor_id": advisor_id,
+                    "age_group": "30-39",
+                    "created_at": base + timedelta(seconds=i),
+                }
+                for i in range(start, min(start + SEED_CHUNK, count))
+            ])
+            db.commit()
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed * 1000, peak / 1024 / 1024
+
+
+def list_all(advisor_id):
+    with SessionLocal() as db:
+        [UserResponse.model_validate(u).model_dump_json() for u in get_users(db, advisor_id)]
+
+
+def first_page(advisor_id):
+    with SessionLocal() as db:
+        users, _ = get_users_page(db, advisor_id, USERS_PAGE_MAX_LIMIT)
+        [UserResponse.model_validate(u).model_dump_json() for u in users]
+
+
+def walk_pages(advisor_id):
+    with SessionLocal() as db:
+        cursor = None
+        while True:
+            users, cursor = get_users_page(db, advisor_id, USERS_PAGE_MAX_LIMIT, cursor)
+            [UserResponse.model_validate(u).model_dump_json() for u in users]
+            if cursor is None:
+                break
+
+
+def stream(advisor_id):
+    for _ in iter_users_ndjson(advisor_id):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    init_db()
+    with SessionLocal() as db:
+        advisor = FinancialAdvisor(name="Bench Advisor", email=f"bench-{time.time_ns()}@example.invalid",
+                                   password="!")
+        db.add(advisor)
+        db.commit()
+        advisor_id = advisor.id
+
+    print(f"{'users':>9} {'mode':<7} {'ms':>10} {'peak MiB':>9}")
+    seeded = 0
+    try:
+        for size in sorted(args.sizes):
+            with SessionLocal() as db:
+                db.execute(delete(User).where(User.advisor_id == advisor_id))
+                db.commit()
+            seed(advisor_id, size)
+            seeded = size
+            for mode, fn in (("all", list_all), ("page", first_page), ("walk", walk_pages), ("ndjson", stream)):
+                ms, peak = measure(lambda: fn(advisor_id))
+                print(f"{size:>9} {mode:<7} {ms:>10.1f} {peak:>9.1f}")
+    finally:
+        with SessionLocal() as db:
+            if seeded:
+                db.execute(delete(User).where(User.advisor_id == advisor_id))
+            db.execute(delete(FinancialAdvisor).where(FinancialAdvisor.id == advisor_id))
+            db.commit()
+
+
+if __name__ == "__main__":
+    main()
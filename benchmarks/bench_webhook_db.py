@@ -0,0 +1,98 @@
+"""
+Concurrent webhook DB-path benchmark: blocking sync session vs. async session.
+
+Each simulated webhook performs the same DB work as handle_webhook for an
+open-ended answer: load the advisor's question tree, insert a UserReply and
+commit. "sync" runs it on SessionLocal directly on the event loop (the old
+code path); "async" runs it on AsyncSessionLocal (the current code path).
+
+Requires DATABASE_URL (and optionally ASYNC_DATABASE_URL) pointing at a
+scratch MySQL database that already holds at least one advisor, question
+and user.
+
+    python -m benchmarks.bench_webhook_db --advisor-id 1 --user-id 1 \
+        --concurrency 1 10 50 100 200 --requests 1000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from sqlalchemy import select, delete
+
+from models.database import SessionLocal, AsyncSessionLocal, DecisionTreeQuestion, UserReply
+
+BENCH_REPLY = "__bench_reply__"
+
+
+def sync_webhook(advisor_id: int, user_id: int):
+    db = SessionLocal()
+    try:
+        rows = db.execute(
+            select(DecisionTreeQuestion).where(DecisionTreeQuestion.advisor_id == advisor_id)
+        ).scalars().all()
+        db.add(UserReply(user_id=user_id, question_id=rows[0].id, reply=BENCH_REPLY))
+        db.commit()
+    finally:
+        db.close()
+
+
+async def async_webhook(advisor_id: int, user_id: int):
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(
+            select(DecisionTreeQuestion).where(DecisionTreeQuestion.advisor_id == advisor_id)
+        )).scalars().all()
+        db.add(UserReply(user_id=user_id, question_id=rows[0].id, reply=BENCH_REPLY))
+        await db.commit()
+
+
+async def run(mode: str, concurrency: int, total: int, advisor_id: int, user_id: int):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            if mode == "sync":
+                sync_webhook(advisor_id, user_id)
+            else:
+                await async_webhook(advisor_id, user_id)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "rps": total / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+async def cleanup():
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(UserReply).where(UserReply.reply == BENCH_REPLY))
+        await db.commit()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--advisor-id", type=int, required=True)
+    parser.add_argument("--user-id", type=int, required=True)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50, 100])
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    print(f"{'mode':<6} {'conc':>5} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    try:
+        for concurrency in args.concurrency:
+            for mode in ("sync", "async"):
+                result = await run(mode, concurrency, args.requests, args.advisor_id, args.user_id)
+                print(f"{mode:<6} {concurrency:>5} {result['rps']:>9.1f} {result['p50_ms']:>9.2f} {result['p99_ms']:>9.2f}")
+    finally:
+        await cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
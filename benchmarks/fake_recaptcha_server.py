@@ -0,0 +1,70 @@
+"""
+Local stand-in for Google's reCAPTCHA siteverify endpoint.
+
+Accepts POST /recaptcha/api/siteverify with secret and response fields.
+Tokens starting with "bad" fail verification; every other token passes.
+Latency and an error rate can be injected to exercise the circuit breaker.
+Point the app at it with CAPTCHA_URL=http://127.0.0.1:8098/recaptcha/api/siteverify.
+
+    python -m benchmarks.fake_recaptcha_server --port 8098 --latency-ms 40
+"""
+import argparse
+import asyncio
+import random
+from datetime import datetime, timezone
+
+from aiohttp import web
+
+VERIFY_PATH = "/recaptcha/api/siteverify"
+
+
+def create_app(latency_ms: float = 0.0, error_rate: float = 0.0) -> web.Application:
+    app = web.Application()
+    app["verified"] = 0
+    app["latency_ms"] = latency_ms
+    app["error_rate"] = error_rate
+
+    async def siteverify(request: web.Request) -> web.Response:
+        form = await request.post()
+        if app["latency_ms"]:
+            await asyncio.sleep(app["latency_ms"] / 1000)
+        if app["error_rate"] and random.random() < app["error_rate"]:
+            return web.json_response({"error": "unavailable"}, status=503)
+        app["verified"] += 1
+        token = form.get("response", "")
+        if not form.get("secret") or not token or token.startswith("bad"):
+            return web.json_response({"success": False, "error-codes": ["invalid-input-response"]})
+        return web.json_response({
+            "success": True,
+            "challenge_ts": datetime.now(timezone.utc).isoformat(),
+            "hostname": "localhost",
+        })
+
+    app.router.add_post(VERIFY_PATH, siteverify)
+    return app
+
+
+async def start_fake_recaptcha(host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0.0,
+                               error_rate: float = 0.0):
+    """Start the server in the running loop; returns (runner, app, verify_url)."""
+    app = create_app(latency_ms, error_rate)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = site._server.sockets[0].getsockname()[1]
+    return runner, app, f"http://{host}:{bound_port}{VERIFY_PATH}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8098)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    web.run_app(create_app(args.latency_ms, args.error_rate), host=args.host, port=args.port, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Local stand-in for Twilio's Messages API, for offline throughput runs.
+
+Accepts POST /2010-04-01/Accounts/{AccountSid}/Messages.json and answers
+with a queued message resource after an optional artificial latency.
+Point the app at it with TWILIO_API_BASE_URL=http://127.0.0.1:8099.
+
+    python -m benchmarks.fake_twilio_server --port 8099 --latency-ms 80
+"""
+import argparse
+import asyncio
+import random
+import uuid
+
+from aiohttp import web
+
+
+def create_app(latency_ms: float = 0.0, error_rate: float = 0.0) -> web.Application:
+    app = web.Application()
+    app["sent"] = 0
+
+    async def create_message(request: web.Request) -> web.Response:
+        form = await request.post()
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        if "To" not in form:
+            return web.json_response(
+                {"code": 21604, "message": "A 'To' phone number is required.", "status": 400}, status=400
+            )
+        if error_rate and random.random() < error_rate:
+            return web.json_response(
+                {"code": 20429, "message": "Too Many Requests", "status": 429}, status=429
+            )
+        app["sent"] += 1
+        return web.json_response({
+            "sid": f"SM{uuid.uuid4().hex}",
+            "account_sid": request.match_info["account_sid"],
+            "to": form["To"],
+            "from": form.get("From"),
+            "status": "queued",
+        }, status=201)
+
+    app.router.add_post("/2010-04-01/Accounts/{account_sid}/Messages.json", create_message)
+    return app
+
+
+async def start_fake_twilio(host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0.0,
+                            error_rate: float = 0.0):
+    """Start the server in the running loop; returns (runner, base_url)."""
+    runner = web.AppRunner(create_app(latency_ms, error_rate), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://{host}:{bound_port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    web.run_app(create_app(args.latency_ms, args.error_rate), host=args.host, port=args.port, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Initial schema: advisors, questions, users and replies
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "financial_advisors",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("name", sa.String(length=100), nullable=False),
+        sa.Column("mobile_number", sa.String(length=20), nullable=True),
+        sa.Column("email", sa.String(length=100), nullable=False),
+        sa.Column("password", sa.String(length=255), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("email"),
+        sa.UniqueConstraint("mobile_number"),
+    )
+    op.create_index("ix_financial_advisors_id", "financial_advisors", ["id"])
+
+    op.create_table(
+        "decision_tree_questions",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("advisor_id", sa.Integer(), nullable=True),
+        sa.Column("question", sa.String(length=10000), nullable=False),
+        sa.Column("triggerKeyword", sa.String(length=50), nullable=True),
+        sa.Column("step", sa.Integer(), nullable=False),
+        sa.Column("next_step", sa.Integer(), nullable=True),
+        sa.Column("is_predefined_answer", sa.Boolean(), nullable=True),
+        sa.ForeignKeyConstraint(["advisor_id"], ["financial_advisors.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_decision_tree_questions_id", "decision_tree_questions", ["id"])
+
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("salutation", sa.String(length=10), nullable=True),
+        sa.Column("name", sa.String(length=100), nullable=False),
+        sa.Column("mobile_number", sa.String(length=20), nullable=False),
+        sa.Column("email", sa.String(length=100), nullable=True),
+        sa.Column("advisor_id", sa.Integer(), nullable=True),
+        sa.Column("age_group", sa.String(length=20), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["advisor_id"], ["financial_advisors.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("email"),
+        sa.UniqueConstraint("mobile_number"),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+
+    op.create_table(
+        "user_replies",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        sa.Column("question_id", sa.Integer(), nullable=True),
+        sa.Column("reply", sa.String(length=255), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["question_id"], ["decision_tree_questions.id"]),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_user_replies_id", "user_replies", ["id"])
+
+
+def downgrade():
+    op.drop_index("ix_user_replies_id", table_name="user_replies")
+    op.drop_table("user_replies")
+    op.drop_index("ix_users_id", table_name="users")
+    op.drop_table("users")
+    op.drop_index("ix_decision_tree_questions_id", table_name="decision_tree_questions")
+    op.drop_table("decision_tree_questions")
+    op.drop_index("ix_financial_advisors_id", table_name="financial_advisors")
+    op.drop_table("financial_advisors")
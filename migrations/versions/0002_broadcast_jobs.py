@@ -0,0 +1,56 @@
+"""Broadcast job and per-recipient outcome tables
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "broadcast_jobs",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("advisor_id", sa.Integer(), nullable=False),
+        sa.Column("content_sid", sa.String(length=64), nullable=False),
+        sa.Column("user_ids", sa.JSON(), nullable=True),
+        sa.Column("status", sa.String(length=20), nullable=False),
+        sa.Column("total", sa.Integer(), nullable=True),
+        sa.Column("owner", sa.String(length=100), nullable=True),
+        sa.Column("heartbeat_at", sa.DateTime(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["advisor_id"], ["financial_advisors.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_broadcast_jobs_id", "broadcast_jobs", ["id"])
+
+    op.create_table(
+        "broadcast_recipients",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("job_id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("status", sa.String(length=10), nullable=False),
+        sa.Column("message_sid", sa.String(length=64), nullable=True),
+        sa.Column("error", sa.String(length=255), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["job_id"], ["broadcast_jobs.id"]),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("job_id", "user_id", name="uq_broadcast_recipients_job_user"),
+    )
+    op.create_index("ix_broadcast_recipients_id", "broadcast_recipients", ["id"])
+
+
+def downgrade():
+    op.drop_index("ix_broadcast_recipients_id", table_name="broadcast_recipients")
+    op.drop_table("broadcast_recipients")
+    op.drop_index("ix_broadcast_jobs_id", table_name="broadcast_jobs")
+    op.drop_table("broadcast_jobs")
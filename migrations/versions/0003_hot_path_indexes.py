@@ -0,0 +1,33 @@
+"""Composite indexes for the webhook, listing, form and reply queries
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # get_question / question tree load: WHERE advisor_id = ? ORDER BY step
+    op.create_index(
+        "ix_decision_tree_questions_advisor_id_step", "decision_tree_questions", ["advisor_id", "step"]
+    )
+    # get_users_page: WHERE advisor_id = ? ORDER BY created_at, id (id rides along in InnoDB)
+    op.create_index("ix_users_advisor_id_created_at", "users", ["advisor_id", "created_at"])
+    # submit_form: WHERE mobile_number = ? AND advisor_id = ?
+    op.create_index("ix_users_mobile_number_advisor_id", "users", ["mobile_number", "advisor_id"])
+    # get_user_replies: WHERE user_id IN (...) joined on question_id
+    op.create_index("ix_user_replies_user_id_question_id", "user_replies", ["user_id", "question_id"])
+
+
+def downgrade():
+    op.drop_index("ix_user_replies_user_id_question_id", table_name="user_replies")
+    op.drop_index("ix_users_mobile_number_advisor_id", table_name="users")
+    op.drop_index("ix_users_advisor_id_created_at", table_name="users")
+    op.drop_index("ix_decision_tree_questions_advisor_id_step", table_name="decision_tree_questions")
@@ -0,0 +1,32 @@
+"""Per-advisor messaging settings (content template SIDs and sender)
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "advisor_messaging_settings",
+        sa.Column("advisor_id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("first_content_sid", sa.String(length=64), nullable=True),
+        sa.Column("last_content_sid", sa.String(length=64), nullable=True),
+        sa.Column("messaging_service_sid", sa.String(length=64), nullable=True),
+        sa.Column("from_number", sa.String(length=20), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["advisor_id"], ["financial_advisors.id"]),
+        sa.PrimaryKeyConstraint("advisor_id"),
+    )
+
+
+def downgrade():
+    op.drop_table("advisor_messaging_settings")
@@ -0,0 +1,19 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime
+
+class BroadcastJobResponse(BaseModel):
+    job_id: int
+    status: str
+    total: Optional[int] = None
+
+class BroadcastStatusResponse(BaseModel):
+    job_id: int
+    advisor_id: int
+    status: str
+    total: Optional[int] = None
+    sent: int
+    failed: int
+    pending: Optional[int] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
@@ -1,20 +1,33 @@
 # app/models/config_models.py
 from pydantic import BaseModel, Field, validator
+from typing import Optional
 import re
 
 class ContentSIDsRequest(BaseModel):
     first_content_sid: str = Field(..., description="First content SID")
+    last_content_sid: Optional[str] = Field(None, description="Content SID sent when the questionnaire completes")
+    messaging_service_sid: Optional[str] = Field(None, description="Messaging service SID used to send")
+    from_number: Optional[str] = Field(None, description="WhatsApp sender number, without the whatsapp: prefix")
     
-    @validator('first_content_sid')
+    @validator('first_content_sid', 'last_content_sid')
     def validate_sid_format(cls, v):
-        if not re.match(r'^HX[a-f0-9]{32}$', v):
+        if v is not None and not re.match(r'^HX[a-f0-9]{32}$', v):
             raise ValueError('SID must start with HX followed by 32 hex characters')
         return v
 
+    @validator('messaging_service_sid')
+    def validate_messaging_service_sid(cls, v):
+        if v is not None and not re.match(r'^MG[a-f0-9]{32}$', v):
+            raise ValueError('Messaging service SID must start with MG followed by 32 hex characters')
+        return v
+
 class ContentSIDsResponse(BaseModel):
     success: bool
     message: str
     first_content_sid: str | None = None
+    last_content_sid: str | None = None
+    messaging_service_sid: str | None = None
+    from_number: str | None = None
 
 class ErrorResponse(BaseModel):
-    detail: str
\ No newline at end of file
+    detail: str
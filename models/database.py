@@ -1,10 +1,14 @@
 import logging
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, create_engine, DateTime
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, create_engine, DateTime, JSON, UniqueConstraint, Index, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
 import os
+import time
 from dotenv import load_dotenv
 from datetime import datetime, timezone
+from services.metrics import DB_POOL_CHECKOUT_SECONDS, instrument_engine
 
 logger = logging.getLogger(__name__)
 load_dotenv()
@@ -14,6 +18,7 @@ Base = declarative_base()
 # [Model definitions remain the same as before...]
 class DecisionTreeQuestion(Base):
     __tablename__ = "decision_tree_questions"
+    __table_args__ = (Index("ix_decision_tree_questions_advisor_id_step", "advisor_id", "step"),)
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     advisor_id = Column(Integer, ForeignKey("financial_advisors.id"))
     question = Column(String(10000), nullable=False)
@@ -24,6 +29,10 @@ class DecisionTreeQuestion(Base):
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_advisor_id_created_at", "advisor_id", "created_at"),
+        Index("ix_users_mobile_number_advisor_id", "mobile_number", "advisor_id"),
+    )
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     salutation = Column(String(10))
     name = Column(String(100), nullable=False)
@@ -43,24 +52,128 @@ class FinancialAdvisor(Base):
 
 class UserReply(Base):
     __tablename__ = "user_replies"
+    __table_args__ = (Index("ix_user_replies_user_id_question_id", "user_id", "question_id"),)
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     question_id = Column(Integer, ForeignKey("decision_tree_questions.id"))
     reply = Column(String(255), nullable=False)
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
 
+class AdvisorMessagingSettings(Base):
+    """Per-advisor Twilio templates and sender; NULL columns fall back to the global config."""
+    __tablename__ = "advisor_messaging_settings"
+    advisor_id = Column(Integer, ForeignKey("financial_advisors.id"), primary_key=True, autoincrement=False)
+    first_content_sid = Column(String(64))  # Welcome message sent after submit_form
+    last_content_sid = Column(String(64))  # Message sent when the questionnaire completes
+    messaging_service_sid = Column(String(64))
+    from_number = Column(String(20))
+    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc),
+                        onupdate=lambda: datetime.now(timezone.utc), nullable=False)
+
+class BroadcastJob(Base):
+    __tablename__ = "broadcast_jobs"
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    advisor_id = Column(Integer, ForeignKey("financial_advisors.id"), nullable=False)
+    content_sid = Column(String(64), nullable=False)
+    user_ids = Column(JSON)  # Optional recipient filter; NULL means every user of the advisor
+    status = Column(String(20), nullable=False, default="queued")  # queued | running | completed
+    total = Column(Integer)
+    owner = Column(String(100))  # Worker currently draining the job
+    heartbeat_at = Column(DateTime)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    finished_at = Column(DateTime)
+
+class BroadcastRecipient(Base):
+    __tablename__ = "broadcast_recipients"
+    __table_args__ = (UniqueConstraint("job_id", "user_id", name="uq_broadcast_recipients_job_user"),)
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    job_id = Column(Integer, ForeignKey("broadcast_jobs.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    status = Column(String(10), nullable=False)  # sent | failed
+    message_sid = Column(String(64))
+    error = Column(String(255))
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL, echo=False)
+# Async driver URL, e.g. mysql+aiomysql://...; derived from DATABASE_URL when not set
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or DATABASE_URL.replace("+pymysql", "+aiomysql", 1)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - start, "sync")
+
+class TimedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that records how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - start, "async")
+
+engine = create_engine(DATABASE_URL, echo=False, poolclass=TimedQueuePool)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    echo=False,
+    poolclass=TimedAsyncAdaptedQueuePool,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_pre_ping=True,
+    pool_recycle=3600,
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# Per-statement timings for /metrics
+instrument_engine(engine, "sync")
+instrument_engine(async_engine.sync_engine, "async")
+
+# Revisions matching databases that were built with Base.metadata.create_all
+LEGACY_SCHEMA_REVISIONS = (
+    ("broadcast_jobs", "0002"),
+    ("users", "0001"),
+)
+MIGRATION_LOCK_NAME = "whatsapp_bot_migrations"
+
 def init_db():
+    """Bring the schema up to the latest Alembic revision."""
+    from alembic import command
+    from alembic.config import Config
+
     try:
-        logger.info("Creating database tables...")
-        Base.metadata.create_all(bind=engine)
-        logger.info("Database tables created successfully.")
+        logger.info("Running database migrations...")
+        config = Config(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini"))
+        with engine.begin() as connection:
+            # Serialize concurrent upgrades when several workers start at once
+            if connection.dialect.name == "mysql":
+                connection.execute(text("SELECT GET_LOCK(:name, 60)"), {"name": MIGRATION_LOCK_NAME})
+            try:
+                config.attributes["connection"] = connection
+                tables = set(inspect(connection).get_table_names())
+                if "alembic_version" not in tables:
+                    for table, revision in LEGACY_SCHEMA_REVISIONS:
+                        if table in tables:
+                            logger.info("Existing schema without migration history, stamping revision %s", revision)
+                            command.stamp(config, revision)
+                            break
+                command.upgrade(config, "head")
+            finally:
+                if connection.dialect.name == "mysql":
+                    connection.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": MIGRATION_LOCK_NAME})
+        logger.info("Database migrations applied successfully.")
     except Exception as e:
-        logger.error(f"Failed to initialize database: {str(e)}")
+        logger.error("Failed to initialize database: %s", e)
         raise
 
 def get_db():
@@ -68,7 +181,16 @@ def get_db():
     try:
         yield db
     except Exception as e:
-        logger.error(f"Database session error: {str(e)}")
+        logger.error("Database session error: %s", e)
         raise
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+        except Exception as e:
+            logger.error("Async database session error: %s", e)
+            await db.rollback()
+            raise
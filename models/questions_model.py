@@ -12,6 +12,21 @@ class UpdateQuestionRequest(BaseModel):
     step: int = Field(..., description="Step number of the question")
     question: str = Field(..., description="The updated question text")
 
+class ReorderQuestionsRequest(BaseModel):
+    question_ids: List[int] = Field(..., description="Every question ID of the advisor, in the new step order")
+
+class TreeQuestion(BaseModel):
+    question: str = Field(..., description="The question text")
+    triggerKeyword: str = Field(..., min_length=1, max_length=50, description="Keyword that triggers the question")
+    is_predefined_answer: bool = Field(False, description="Indicates if the answer is predefined")
+    step: Optional[int] = Field(None, ge=1, description="Step within this tree; defaults to the list position")
+    next_step: Optional[int] = Field(None, ge=1, description="Step to branch to; defaults to step + 1")
+
+class QuestionTreeImportRequest(BaseModel):
+    advisor_id: int = Field(..., description="ID of the advisor")
+    replace: bool = Field(False, description="Replace the advisor's tree instead of appending to it")
+    questions: List[TreeQuestion] = Field(..., min_length=1, max_length=5000)
+
 # Response Models
 class QuestionResponse(BaseModel):
     id: int
@@ -23,4 +38,10 @@ class QuestionListResponse(BaseModel):
     questions: List[QuestionResponse]
 
 class MessageResponse(BaseModel):
-    message: str
\ No newline at end of file
+    message: str
+
+class QuestionTreeImportResponse(BaseModel):
+    message: str
+    imported: int
+    first_step: int
+    last_step: int
@@ -19,7 +19,7 @@ class SubmitFormRequest(BaseModel):
 
 class SubmitFormResponse(BaseModel):
     success: bool
-    message_sid: str
+    message_sid: Optional[str] = None
     message: str
     timestamp: str
 
@@ -36,9 +36,25 @@ class UserResponse(BaseModel):
     class Config:
         from_attributes = True  # Enable ORM mode
 
+class UserPageResponse(BaseModel):
+    users: List[UserResponse]
+    next_cursor: Optional[str] = None
+
+class DeleteUserRequest(BaseModel):
+    user_id: int
+    advisor_id: int
+
+class DeleteUserResponse(BaseModel):
+    success: bool
+    message: str
+    user_id: int
+    deleted_replies: int
+
 class UserRepliesResponse(BaseModel):
     question:str
     reply:str
+    step: Optional[int] = None
+    created_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True  # Enable ORM mode
\ No newline at end of file
@@ -2,6 +2,7 @@ import logging
 from fastapi import APIRouter, Depends, HTTPException, status, Body
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from services.auth_service import (
     login,
     logout,
@@ -9,7 +10,7 @@ from services.auth_service import (
     get_current_advisor,
     oauth2_scheme  # Import the scheme here
 )
-from models.database import get_db
+from models.database import get_db, get_async_db
 from models.auth_model import (
     TokenResponse,
     LoginRequest,
@@ -23,11 +24,11 @@ router = APIRouter(tags=["Authentication"])
 @router.post("/login", response_model=TokenResponse)
 async def login_route(
     login_data: LoginRequest = Body(...),  # Changed from form to JSON body
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Authenticate user and return access/refresh tokens with advisor info."""
     try:
-        tokens = login(db, login_data.email, login_data.password)  # Using login_data instead of form_data
+        tokens = await login(db, login_data.email, login_data.password)  # Using login_data instead of form_data
         advisor_data = {
             "id": tokens["id"],
             "name": tokens["name"],
@@ -42,7 +43,7 @@ async def login_route(
     except HTTPException as e:
         raise e
     except Exception as e:
-        logger.error(f"Login route error: {str(e)}")
+        logger.error("Login route error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error"
@@ -59,7 +60,7 @@ async def refresh_route(
         new_tokens = refresh_tokens(request.refresh_token, db)
         
         # Get current advisor from the new token
-        current_advisor = get_current_advisor(new_tokens["access_token"], db)
+        current_advisor = get_current_advisor(new_tokens["access_token"])
         advisor_data = {
             "id": current_advisor.id,
             "name": current_advisor.name,
@@ -74,7 +75,7 @@ async def refresh_route(
     except HTTPException as e:
         raise e
     except Exception as e:
-        logger.error(f"Refresh route error: {str(e)}")
+        logger.error("Refresh route error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error"
@@ -92,7 +93,7 @@ async def logout_route(
     except HTTPException as e:
         raise e
     except Exception as e:
-        logger.error(f"Logout route error: {str(e)}")
+        logger.error("Logout route error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error"
@@ -1,6 +1,10 @@
 # app/routers/config_router.py
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
 from services.config_service import ConfigService
+from services.auth_service import get_current_advisor
+from services.advisor_cache import AdvisorIdentity
+from models.database import get_db
 from models.config_model import ContentSIDsRequest, ContentSIDsResponse, ErrorResponse
 import logging
 
@@ -13,11 +17,17 @@ router = APIRouter(prefix="/config", tags=["config"])
     response_model=ContentSIDsResponse,
     responses={500: {"model": ErrorResponse}}
 )
-async def update_content_sids(request: ContentSIDsRequest):
+def update_content_sids(
+    request: ContentSIDsRequest,
+    advisor: AdvisorIdentity = Depends(get_current_advisor),
+    db: Session = Depends(get_db)
+):
     try:
-        return ConfigService.update_content_sids(request)
+        return ConfigService.update_content_sids(db, advisor.id, request)
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error in update_content_sids endpoint: {str(e)}")
+        logger.error("Error in update_content_sids endpoint: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get(
@@ -25,9 +35,14 @@ async def update_content_sids(request: ContentSIDsRequest):
     response_model=ContentSIDsResponse,
     responses={404: {"model": ErrorResponse}, 500: {"model": ErrorResponse}}
 )
-async def get_content_sids():
+def get_content_sids(
+    advisor: AdvisorIdentity = Depends(get_current_advisor),
+    db: Session = Depends(get_db)
+):
     try:
-        return ConfigService.get_content_sids()
+        return ConfigService.get_content_sids(db, advisor.id)
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error in get_content_sids endpoint: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        logger.error("Error in get_content_sids endpoint: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
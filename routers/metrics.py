@@ -0,0 +1,99 @@
+# app/routers/metrics.py
+import hmac
+import os
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from services.metrics import REGISTRY, callback_metric
+from services.auth_service import token_cache
+from services.advisor_cache import advisor_cache
+from services.broadcast_service import broadcast_engine
+from services.config_service import messaging_settings_cache
+from services.outbox import outbox
+from services.password_hasher import password_hasher
+from services.question_cache import question_cache
+from services.recaptcha_verifier import recaptcha_verifier
+from services.reply_writer import reply_writer
+from services.session_manager import session_manager
+from services.user_service import reply_cache
+
+# When set, scrapers must send "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+router = APIRouter(tags=["metrics"])
+
+
+def _pick(stats, *keys):
+    """Select stats()[key] for each key as {(key,): value} for a labelled callback metric."""
+    def read():
+        values = stats()
+        return {(key,): values[key] for key in keys}
+    return read
+
+
+# ==== Component gauges and counters, read from existing stats() at scrape time ====
+_CACHES = {
+    "question_tree": question_cache,
+    "reply": reply_cache,
+    "token": token_cache,
+    "advisor": advisor_cache,
+    "messaging_settings": messaging_settings_cache,
+}
+
+callback_metric(
+    "cache_hits_total", "Cache lookups that found a live entry",
+    lambda: {(name,): cache.stats()["hits"] for name, cache in _CACHES.items()}, ("cache",), "counter",
+)
+callback_metric(
+    "cache_misses_total", "Cache lookups that found no live entry",
+    lambda: {(name,): cache.stats()["misses"] for name, cache in _CACHES.items()}, ("cache",), "counter",
+)
+callback_metric("sessions_active", "Chat sessions currently stored", lambda: len(session_manager.store))
+callback_metric(
+    "sessions_expired_total", "Chat sessions removed by the cleanup task",
+    lambda: session_manager.expired_count, metric_type="counter",
+)
+callback_metric(
+    "outbox_queue_depth", "Outbox messages waiting for a worker or a retry",
+    _pick(outbox.stats, "queued", "retry_scheduled"), ("state",),
+)
+callback_metric(
+    "outbox_messages_total", "Outbox messages by result",
+    _pick(outbox.stats, "enqueued", "delivered", "failed", "retried", "dropped"), ("result",), "counter",
+)
+callback_metric("reply_buffer_pending", "Replies waiting for the next bulk insert", lambda: reply_writer.stats()["pending"])
+callback_metric(
+    "reply_buffer_events_total", "Reply write-behind flushes, rows and rejections",
+    _pick(reply_writer.stats, "flushes", "flush_failures", "rows_written", "rejected"), ("event",), "counter",
+)
+callback_metric(
+    "broadcast_jobs", "Broadcast jobs queued or being drained by this process",
+    _pick(broadcast_engine.stats, "queued_jobs", "running_jobs"), ("state",),
+)
+callback_metric(
+    "broadcast_messages_total", "Broadcast sends by result",
+    lambda: {("sent",): broadcast_engine.messages_sent, ("failed",): broadcast_engine.messages_failed},
+    ("result",), "counter",
+)
+callback_metric("password_hasher_waiting", "Password hashes queued or running", lambda: password_hasher.stats()["waiting"])
+callback_metric(
+    "password_hasher_events_total", "Password hash requests by result",
+    _pick(password_hasher.stats, "completed", "rejected", "timed_out"), ("result",), "counter",
+)
+callback_metric(
+    "recaptcha_verifications_total", "reCAPTCHA verifications by result",
+    _pick(recaptcha_verifier.stats, "verified", "failures", "short_circuited"), ("result",), "counter",
+)
+callback_metric(
+    "recaptcha_breaker_open", "1 while the reCAPTCHA circuit breaker is open",
+    lambda: 1 if recaptcha_verifier.breaker.state == "open" else 0,
+)
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics(authorization: Optional[str] = Header(None)):
+    if METRICS_TOKEN and not hmac.compare_digest(authorization or "", f"Bearer {METRICS_TOKEN}"):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
@@ -1,9 +1,10 @@
 import logging
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from services.question_service import add_question, get_questions, update_question, delete_question
+from services.question_service import add_question, get_questions, update_question, delete_question, reorder_questions, import_question_tree, iter_question_tree_json
 from models.database import get_db
-from models.questions_model import AddQuestionRequest, UpdateQuestionRequest, QuestionListResponse, QuestionResponse, MessageResponse
+from models.questions_model import AddQuestionRequest, UpdateQuestionRequest, ReorderQuestionsRequest, QuestionTreeImportRequest, QuestionTreeImportResponse, QuestionListResponse, QuestionResponse, MessageResponse
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -21,40 +22,83 @@ def add_question_route(data: AddQuestionRequest, db: Session = Depends(get_db)):
         )
         return {"message": "Question added successfully"}
     except Exception as e:
-        logger.error(f"Error adding question: {str(e)}")
+        logger.error("Error adding question: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@router.post("/import", response_model=QuestionTreeImportResponse)
+def import_question_tree_route(data: QuestionTreeImportRequest, db: Session = Depends(get_db)):
+    try:
+        logger.info("Import question tree request for advisor_id: %s", data.advisor_id)
+        imported, first_step, last_step = import_question_tree(
+            db,
+            data.advisor_id,
+            [q.model_dump() for q in data.questions],
+            data.replace
+        )
+        return QuestionTreeImportResponse(
+            message="Question tree imported successfully",
+            imported=imported,
+            first_step=first_step,
+            last_step=last_step
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error("Error importing question tree: %s", e)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@router.get("/{advisor_id}/export")
+def export_question_tree_route(advisor_id: int):
+    logger.info("Export question tree request for advisor_id: %s", advisor_id)
+    return StreamingResponse(
+        iter_question_tree_json(advisor_id),
+        media_type="application/json",
+        headers={"Content-Disposition": f'attachment; filename="question-tree-{advisor_id}.json"'}
+    )
+
 @router.get("/{advisor_id}", response_model=QuestionListResponse)
 def get_questions_route(advisor_id: int, db: Session = Depends(get_db)):
     try:
-        logger.info(f"Get questions request for advisor_id: {advisor_id}")
+        logger.info("Get questions request for advisor_id: %s", advisor_id)
         questions = get_questions(db, advisor_id)
         return {"questions": [
             QuestionResponse(id=q.id, step=q.step, question=q.question, triggerKeyword=q.triggerKeyword) 
             for q in questions
         ]}
     except Exception as e:
-        logger.error(f"Error retrieving questions: {str(e)}")
+        logger.error("Error retrieving questions: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.put("/{id}", response_model=MessageResponse)
 def update_question_route(id: int, data: UpdateQuestionRequest, db: Session = Depends(get_db)):
     try:
-        logger.info(f"Update question request for ID: {id}")
+        logger.info("Update question request for ID: %s", id)
         if update_question(db, id, data.step, data.question):
             return {"message": "Question updated successfully"}
         raise HTTPException(status_code=404, detail="Question not found")
     except Exception as e:
-        logger.error(f"Error updating question: {str(e)}")
+        logger.error("Error updating question: %s", e)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@router.put("/{advisor_id}/reorder", response_model=MessageResponse)
+def reorder_questions_route(advisor_id: int, data: ReorderQuestionsRequest, db: Session = Depends(get_db)):
+    try:
+        logger.info("Reorder questions request for advisor_id: %s", advisor_id)
+        reorder_questions(db, advisor_id, data.question_ids)
+        return {"message": "Questions reordered successfully"}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error("Error reordering questions: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.delete("/{id}", response_model=MessageResponse)
 def delete_question_route(id: int, db: Session = Depends(get_db)):
     try:
-        logger.info(f"Delete question request for ID: {id}")
+        logger.info("Delete question request for ID: %s", id)
         if delete_question(db, id):
-            return {"message": "Question deleted and IDs reordered successfully"}
+            return {"message": "Question deleted and steps reordered successfully"}
         raise HTTPException(status_code=404, detail="Question not found")
     except Exception as e:
-        logger.error(f"Error deleting question: {str(e)}")
+        logger.error("Error deleting question: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
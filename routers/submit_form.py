@@ -19,7 +19,7 @@ router = APIRouter()
 def submit_form_route(data: SubmitFormRequest, db: Session = Depends(get_db)):
     logger.info("Submit form request received")
     if data.message:
-        logger.info(f"Message provided: {data.message}")
+        logger.info("Message provided: %s", data.message)
     else:
         logger.info("No message provided in the request")
     result, error = submit_form(db, data.model_dump())
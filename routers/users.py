@@ -1,46 +1,101 @@
 import logging
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List, Optional
 
 from services.user_service import (
     get_users,
+    get_users_page,
+    iter_users_ndjson,
+    USERS_PAGE_DEFAULT_LIMIT,
+    USERS_PAGE_MAX_LIMIT,
     get_user_replies,
+    get_users_replies,
     delete_user  # ✅ Import delete function
 )
-from services.messaging_service import send_message
-from models.database import get_db
+from services.broadcast_service import broadcast_engine, create_broadcast_job, get_broadcast_status
+from models.database import get_db, get_async_db
 from models.user_model import (
     UserResponse,
+    UserPageResponse,
     UserRepliesResponse,
     DeleteUserRequest,
     DeleteUserResponse  
 )
+from models.broadcast_model import BroadcastJobResponse, BroadcastStatusResponse
 
-logger = logging.getLogger(_name_)
+logger = logging.getLogger(__name__)
 router = APIRouter()
 
 @router.get("/users/{advisor_id}", response_model=List[UserResponse])
 def get_users_route(advisor_id: int, db: Session = Depends(get_db)):
-    logger.info(f"Get users request for advisor_id: {advisor_id}")
+    logger.info("Get users request for advisor_id: %s", advisor_id)
     users = get_users(db, advisor_id)
     return [UserResponse.model_validate(u) for u in users]
 
+@router.get("/users/{advisor_id}/page", response_model=UserPageResponse)
+def get_users_page_route(
+    advisor_id: int,
+    limit: int = Query(USERS_PAGE_DEFAULT_LIMIT, ge=1, le=USERS_PAGE_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    logger.info("Get users page request for advisor_id: %s", advisor_id)
+    try:
+        users, next_cursor = get_users_page(db, advisor_id, limit, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return UserPageResponse(
+        users=[UserResponse.model_validate(u) for u in users],
+        next_cursor=next_cursor
+    )
+
+@router.get("/users/{advisor_id}/stream")
+def stream_users_route(advisor_id: int):
+    logger.info("Stream users request for advisor_id: %s", advisor_id)
+    return StreamingResponse(iter_users_ndjson(advisor_id), media_type="application/x-ndjson")
+
+@router.get("/users/{advisor_id}/replies", response_model=Dict[int, List[UserRepliesResponse]])
+def get_users_replies_route(
+    advisor_id: int,
+    user_ids: List[int] = Query(...),
+    db: Session = Depends(get_db)
+):
+    logger.info("Get replies request for advisor_id: %s, %s users", advisor_id, len(user_ids))
+    if len(user_ids) > USERS_PAGE_MAX_LIMIT:
+        raise HTTPException(status_code=400, detail=f"At most {USERS_PAGE_MAX_LIMIT} user_ids per request")
+    replies = get_users_replies(db, advisor_id, user_ids)
+    return {
+        user_id: [UserRepliesResponse.model_validate(r) for r in user_replies]
+        for user_id, user_replies in replies.items()
+    }
+
 @router.get("/users/{advisor_id}/replies/{user_id}", response_model=List[UserRepliesResponse])
 def get_user_replies_route(advisor_id: int, user_id: int, db: Session = Depends(get_db)):
-    logger.info(f"Get user replies request for advisor_id: {advisor_id}, user_id: {user_id}")
+    logger.info("Get user replies request for advisor_id: %s, user_id: %s", advisor_id, user_id)
     replies = get_user_replies(db, advisor_id, user_id)
     return [UserRepliesResponse.model_validate(r) for r in replies]
 
-@router.post("/send_message")
-async def send_message_route(data: dict, db: Session = Depends(get_db)):
+@router.post("/send_message", response_model=BroadcastJobResponse, status_code=202)
+async def send_message_route(data: dict, db: AsyncSession = Depends(get_async_db)):
     logger.info("Send message request received")
-    message_sids = await send_message(db, data["content_sid"], data["advisor_id"], data.get("user_ids", []))
-    return {"message_sids": message_sids}
+    job = await create_broadcast_job(db, data["content_sid"], data["advisor_id"], data.get("user_ids", []))
+    broadcast_engine.submit(job.id)
+    return BroadcastJobResponse(job_id=job.id, status=job.status, total=job.total)
+
+@router.get("/send_message/{job_id}", response_model=BroadcastStatusResponse)
+async def send_message_status_route(job_id: int, db: AsyncSession = Depends(get_async_db)):
+    logger.info("Broadcast status request for job_id: %s", job_id)
+    job_status = await get_broadcast_status(db, job_id)
+    if job_status is None:
+        raise HTTPException(status_code=404, detail="Broadcast job not found")
+    return BroadcastStatusResponse(**job_status)
 
 @router.delete("/delete_user", response_model=DeleteUserResponse)
 def delete_user_route(payload: DeleteUserRequest, db: Session = Depends(get_db)):
-    logger.info(f"Delete user request received: user_id={payload.user_id}, advisor_id={payload.advisor_id}")
+    logger.info("Delete user request received: user_id=%s, advisor_id=%s", payload.user_id, payload.advisor_id)
     result, error = delete_user(db, payload.user_id, payload.advisor_id)
     if error:
         raise HTTPException(status_code=404 if error == "User not found" else 500, detail=error)
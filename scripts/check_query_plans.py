@@ -0,0 +1,117 @@
+"""
+EXPLAIN the hot-path queries against a local MySQL database and fail if
+any of them stops using its index.
+
+Run after `alembic upgrade head` on a database with representative data
+(plans on empty tables are reported as inconclusive):
+
+    DATABASE_URL=mysql+pymysql://... python -m scripts.check_query_plans --advisor-id 1 --user-id 1
+
+Exits 1 when a query uses an unexpected index or scans its table.
+"""
+import argparse
+import sys
+from datetime import datetime
+
+from sqlalchemy import select, text, exists, and_
+
+from models.database import engine, DecisionTreeQuestion, User, BroadcastRecipient
+from services.user_service import USER_LISTING_COLUMNS, _replies_query
+
+INCONCLUSIVE_MARKERS = ("no matching row", "impossible where", "no tables used")
+
+
+def hot_queries(advisor_id: int, user_id: int):
+    """(name, statement, table to check, acceptable index names) per hot query."""
+    return [
+        (
+            "question tree load (get_question)",
+            select(DecisionTreeQuestion)
+            .where(DecisionTreeQuestion.advisor_id == advisor_id)
+            .order_by(DecisionTreeQuestion.step, DecisionTreeQuestion.id),
+            "decision_tree_questions",
+            {"ix_decision_tree_questions_advisor_id_step"},
+        ),
+        (
+            "users first page (get_users_page)",
+            select(*USER_LISTING_COLUMNS)
+            .where(User.advisor_id == advisor_id)
+            .order_by(User.created_at, User.id)
+            .limit(101),
+            "users",
+            {"ix_users_advisor_id_created_at"},
+        ),
+        (
+            "users next page (get_users_page)",
+            select(*USER_LISTING_COLUMNS)
+            .where(User.advisor_id == advisor_id, User.created_at > datetime(2000, 1, 1))
+            .order_by(User.created_at, User.id)
+            .limit(101),
+            "users",
+            {"ix_users_advisor_id_created_at"},
+        ),
+        (
+            "existing user lookup (submit_form)",
+            select(User).where(User.mobile_number == "+6500000000", User.advisor_id == advisor_id),
+            "users",
+            # The unique index on mobile_number alone is an equally good const lookup
+            {"ix_users_mobile_number_advisor_id", "mobile_number"},
+        ),
+        (
+            "user replies (get_user_replies)",
+            _replies_query(advisor_id, [user_id]),
+            "user_replies",
+            {"ix_user_replies_user_id_question_id"},
+        ),
+        (
+            "broadcast resume anti-join (BroadcastEngine)",
+            select(User.id)
+            .where(User.advisor_id == advisor_id, ~exists().where(
+                and_(BroadcastRecipient.job_id == 1, BroadcastRecipient.user_id == User.id)
+            ))
+            .order_by(User.id),
+            "broadcast_recipients",
+            {"uq_broadcast_recipients_job_user"},
+        ),
+    ]
+
+
+def explain(connection, stmt):
+    sql = str(stmt.compile(engine, compile_kwargs={"literal_binds": True}))
+    return [dict(row._mapping) for row in connection.execute(text(f"EXPLAIN {sql}"))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--advisor-id", type=int, default=1)
+    parser.add_argument("--user-id", type=int, default=1)
+    args = parser.parse_args()
+
+    if engine.dialect.name != "mysql":
+        print(f"EXPLAIN checks target MySQL; DATABASE_URL uses {engine.dialect.name}", file=sys.stderr)
+        return 2
+
+    failures = 0
+    with engine.connect() as connection:
+        for name, stmt, table, expected_keys in hot_queries(args.advisor_id, args.user_id):
+            plan = explain(connection, stmt)
+            rows = [row for row in plan if row.get("table") == table]
+            extra = " ".join(str(row.get("Extra") or "") for row in plan).lower()
+            if not rows and any(marker in extra for marker in INCONCLUSIVE_MARKERS):
+                print(f"SKIP  {name}: inconclusive plan on this data ({extra.strip()})")
+                continue
+            used = {row.get("key") for row in rows}
+            scans = [row for row in rows if row.get("type") == "ALL"]
+            if rows and used & expected_keys and not scans:
+                print(f"OK    {name}: {table} uses {', '.join(sorted(k for k in used if k))}")
+            else:
+                failures += 1
+                print(f"FAIL  {name}: {table} uses {sorted(str(k) for k in used) or 'nothing'}, "
+                      f"expected one of {sorted(expected_keys)}")
+                for row in plan:
+                    print(f"        {row}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+# services/advisor_cache.py
+import logging
+import os
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from services.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# No endpoint edits FinancialAdvisor rows; they are changed directly in the
+# database. A renamed, re-addressed or deleted advisor is therefore seen by
+# authenticated endpoints at the advisor's next login on this worker, and
+# within ADVISOR_CACHE_TTL seconds in any case. Passwords are never cached:
+# login always checks the stored hash. Code that modifies an advisor must
+# call advisor_cache.invalidate(advisor_id=..., email=...).
+ADVISOR_CACHE_SIZE = int(os.getenv("ADVISOR_CACHE_SIZE", 1024))
+ADVISOR_CACHE_TTL = float(os.getenv("ADVISOR_CACHE_TTL", 300))
+
+
+@dataclass(frozen=True)
+class AdvisorIdentity:
+    """Detached, read-only identity of a FinancialAdvisor. Never carries the password hash."""
+    id: int
+    name: str
+    email: str
+
+    @classmethod
+    def from_row(cls, row) -> "AdvisorIdentity":
+        return cls(id=row.id, name=row.name, email=row.email)
+
+
+class AdvisorIdentityCache:
+    """Advisor identities addressable by email or id, backed by one TTLCache."""
+
+    def __init__(self, maxsize: int = ADVISOR_CACHE_SIZE, ttl: float = ADVISOR_CACHE_TTL):
+        # Every identity is stored under both of its keys
+        self._cache = TTLCache(maxsize=maxsize * 2, ttl=ttl)
+
+    def get_by_email(self, email: str) -> Optional[AdvisorIdentity]:
+        return self._cache.get(("email", email))
+
+    def get_by_id(self, advisor_id: int) -> Optional[AdvisorIdentity]:
+        return self._cache.get(("id", advisor_id))
+
+    def put(self, identity: AdvisorIdentity):
+        self._cache.set(("email", identity.email), identity)
+        self._cache.set(("id", identity.id), identity)
+
+    def invalidate(self, advisor_id: Optional[int] = None, email: Optional[str] = None):
+        """Drop an advisor by id and/or email; with neither, drop everyone."""
+        if advisor_id is None and email is None:
+            self._cache.clear()
+            logger.info("Advisor identity cache cleared")
+            return
+        identity = self.get_by_id(advisor_id) if advisor_id is not None else self.get_by_email(email)
+        keys = {("id", advisor_id), ("email", email)}
+        if identity is not None:
+            keys |= {("id", identity.id), ("email", identity.email)}
+        for key in keys:
+            if key[1] is not None:
+                self._cache.invalidate(key)
+
+    def stats(self) -> Dict[str, float]:
+        return self._cache.stats()
+
+
+advisor_cache = AdvisorIdentityCache()
@@ -1,15 +1,23 @@
+import hashlib
 import logging
 import os
+import uuid
 from datetime import datetime, timezone, timedelta
 from typing import Optional
-from werkzeug.security import check_password_hash, generate_password_hash
+from werkzeug.security import generate_password_hash
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from jose import JWTError, jwt
 from fastapi import HTTPException, status, Depends, HTTPException, Security
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.security import OAuth2PasswordBearer
-from models.database import FinancialAdvisor, get_db
+from models.database import FinancialAdvisor, SessionLocal
 from models.auth_model import TokenData
+from services.ttl_cache import TTLCache
+from services.advisor_cache import AdvisorIdentity, advisor_cache
+from services.revocation_store import revocation_store
+from services.password_hasher import PasswordPoolBusy, password_hasher
 
 # Configure logger
 logger = logging.getLogger(__name__)
@@ -19,11 +27,12 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
 REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 7))
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 1024))
 
 security = HTTPBearer()
 
-# Token blacklist (in production, use Redis or database)
-token_blacklist = set()
+# Verified payloads keyed by token digest; each entry expires with its token's exp
+token_cache = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=None)
 
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
@@ -39,18 +48,25 @@ def hash_password(password: str) -> str:
         logger.debug("Hashing password...")
         return generate_password_hash(password)
     except Exception as e:
-        logger.error(f"Error hashing password: {str(e)}")
+        logger.error("Error hashing password: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to hash password"
         )
 
-def verify_password(stored_password: str, provided_password: str) -> bool:
-    """Verify a provided password against a stored hash."""
+async def verify_password(stored_password: str, provided_password: str) -> bool:
+    """Verify a provided password against a stored hash on the bounded hashing pool."""
     try:
-        return check_password_hash(stored_password, provided_password)
+        return await password_hasher.verify(stored_password, provided_password)
+    except PasswordPoolBusy as e:
+        logger.warning("Password verification rejected: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many login attempts in progress, please retry",
+            headers={"Retry-After": "1"}
+        )
     except Exception as e:
-        logger.error(f"Error verifying password: {str(e)}")
+        logger.error("Error verifying password: %s", e)
         return False
 
 def get_token_expiry(token_type: str) -> datetime:
@@ -67,17 +83,18 @@ def create_token(data: dict, token_type: str = "access") -> str:
     try:
         to_encode = data.copy()
         expire = get_token_expiry(token_type)
-        logger.debug(f"Creating {token_type} token for data: {to_encode}")
+        logger.debug("Creating %s token for data: %s", token_type, to_encode)
         
         to_encode.update({
             "exp": expire,
-            "type": token_type
+            "type": token_type,
+            "jti": uuid.uuid4().hex
         })
         token = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-        logger.debug(f"Successfully created {token_type} token")
+        logger.debug("Successfully created %s token", token_type)
         return token
     except Exception as e:
-        logger.error(f"Error creating {token_type} token: {str(e)}")
+        logger.error("Error creating %s token: %s", token_type, e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to create {token_type} token"
@@ -85,58 +102,97 @@ def create_token(data: dict, token_type: str = "access") -> str:
 
 def create_access_token(data: dict) -> str:
     """Create an access token with standard expiration."""
-    logger.debug(f"Creating access token for data: {data}")
+    logger.debug("Creating access token for data: %s", data)
     return create_token(data, token_type="access")
 
 def create_refresh_token(data: dict) -> str:
     """Create a refresh token with longer expiration."""
-    logger.debug(f"Creating refresh token for data: {data}")
+    logger.debug("Creating refresh token for data: %s", data)
     return create_token(data, token_type="refresh")
 
+def _token_digest(token_str: str) -> bytes:
+    return hashlib.sha256(token_str.encode()).digest()
+
+def _token_id(payload: dict, token_str: str) -> str:
+    """Revocation key: the jti claim, or a digest for tokens issued without one."""
+    return payload.get("jti") or _token_digest(token_str).hex()
+
+def _decode_token_str(token_str: str) -> dict:
+    """
+    Verify a raw JWT, serving repeat tokens from token_cache.
+
+    Only payloads that passed verification are cached, and only until their
+    exp; the revocation check runs on every call, cached or not.
+    """
+    if not token_str:
+        logger.debug("No token provided")
+        raise JWTError("Missing token")
+
+    digest = _token_digest(token_str)
+    payload = token_cache.get(digest)
+    if payload is not None:
+        if revocation_store.is_revoked(_token_id(payload, token_str)):
+            raise JWTError("Token revoked")
+        return dict(payload)
+
+    if len(token_str.split('.')) != 3:
+        logger.debug("Invalid token format detected")
+        raise JWTError("Invalid token format")
+
+    payload = jwt.decode(token_str, SECRET_KEY, algorithms=[ALGORITHM])
+    logger.debug("Token decoded successfully. Type: %s", payload.get('type'))
+
+    if payload.get("type") not in ["access", "refresh"]:
+        logger.debug("Invalid token type: %s", payload.get('type'))
+        raise JWTError("Invalid token type")
+
+    if revocation_store.is_revoked(_token_id(payload, token_str)):
+        raise JWTError("Token revoked")
+
+    if payload.get("exp") is not None:
+        token_cache.set(digest, payload, expires_at=float(payload["exp"]))
+    return dict(payload)
+
 def decode_token(token: HTTPAuthorizationCredentials = Security(security)) -> dict:
-    """Decode and verify a JWT token."""
+    """Decode and verify a JWT token, given bearer credentials or the raw token string."""
     try:
-        logger.debug("Starting token decode")
+        if isinstance(token, str):
+            return _decode_token_str(token)
         if not token or not token.credentials:
             logger.debug("No token provided")
             raise JWTError("Missing token")
-        logger.info(f"Token provided: {token}")
-        token_str = token.credentials
-        logger.debug(f"Token scheme: {token.scheme}")
-        
-        if len(token_str.split('.')) != 3:
-            logger.debug("Invalid token format detected")
-            raise JWTError(f"Invalid token format:{token_str}")
-
-        payload = jwt.decode(token_str, SECRET_KEY, algorithms=[ALGORITHM])
-        logger.debug(f"Token decoded successfully. Type: {payload.get('type')}")
-        
-        if payload.get("type") not in ["access", "refresh"]:
-            logger.debug(f"Invalid token type: {payload.get('type')}")
-            raise JWTError("Invalid token type")
-            
-        return payload
+        return _decode_token_str(token.credentials)
     except JWTError as e:
-        logger.error(f"JWT decode error: {str(e)}")
+        logger.error("JWT decode error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials",
             headers={"WWW-Authenticate": "Bearer"}
         )
 
-def get_current_advisor(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> FinancialAdvisor:
+def resolve_advisor(email: str, db: Optional[Session] = None) -> Optional[AdvisorIdentity]:
+    """
+    Look up an advisor's identity by email, from advisor_cache when possible.
+    A session is only opened (or the given one used) on a cache miss.
+    """
+    identity = advisor_cache.get_by_email(email)
+    if identity is not None:
+        return identity
+
+    if db is None:
+        with SessionLocal() as own_db:
+            return resolve_advisor(email, own_db)
+    row = db.query(FinancialAdvisor.id, FinancialAdvisor.name, FinancialAdvisor.email).filter_by(email=email).first()
+    if row is None:
+        return None
+    identity = AdvisorIdentity.from_row(row)
+    advisor_cache.put(identity)
+    return identity
+
+def get_current_advisor(token: str = Depends(oauth2_scheme)) -> AdvisorIdentity:
     """Get the current authenticated advisor from the token."""
     try:
-        # Check if token is blacklisted
-        if token in token_blacklist:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Token revoked"
-            )
-            
+        # Revoked tokens are rejected by decode_token
         payload = decode_token(token)
         email: str = payload.get("sub")
         if email is None:
@@ -145,7 +201,7 @@ def get_current_advisor(
                 detail="Invalid authentication credentials"
             )
         
-        advisor = db.query(FinancialAdvisor).filter_by(email=email).first()
+        advisor = resolve_advisor(email)
         if advisor is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -155,25 +211,33 @@ def get_current_advisor(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error getting current user: {str(e)}")
+        logger.error("Error getting current user: %s", e)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials"
         )
 
-def login(db: Session, email: str, password: str) -> dict:
+async def login(db: AsyncSession, email: str, password: str) -> dict:
     """Authenticate a financial advisor and return tokens."""
     try:
-        logger.info(f"Attempting login for email: {email}")
+        logger.info("Attempting login for email: %s", email)
         
-        advisor = db.query(FinancialAdvisor).filter_by(email=email).first()
-        if not advisor or not verify_password(advisor.password, password):
-            logger.warning(f"Invalid credentials for email: {email}")
+        result = await db.execute(select(FinancialAdvisor).filter_by(email=email))
+        advisor = result.scalars().first()
+        if not advisor:
+            # The advisor may have been deleted since their identity was cached
+            advisor_cache.invalidate(email=email)
+        if not advisor or not await verify_password(advisor.password, password):
+            logger.warning("Invalid credentials for email: %s", email)
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid credentials"
             )
 
+        # Refresh the cached identity from the row just read
+        advisor_cache.invalidate(advisor_id=advisor.id)
+        advisor_cache.put(AdvisorIdentity.from_row(advisor))
+
         # Create tokens
         token_data = {"sub": advisor.email}
         access_token = create_access_token(token_data)
@@ -191,22 +255,23 @@ def login(db: Session, email: str, password: str) -> dict:
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Login error for {email}: {str(e)}")
+        logger.error("Login error for %s: %s", email, e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error"
         )
 
 def logout(token: str = Depends(oauth2_scheme)) -> bool:
-    """Add token to blacklist (logout)."""
+    """Revoke a token until it expires (logout)."""
     try:
         # Verify token first
         payload = decode_token(token)
-        token_blacklist.add(token)
-        logger.info(f"Token revoked for user: {payload.get('sub')}")
+        revocation_store.revoke(_token_id(payload, token), float(payload["exp"]))
+        token_cache.invalidate(_token_digest(token))
+        logger.info("Token revoked for user: %s", payload.get('sub'))
         return True
     except Exception as e:
-        logger.error(f"Logout error: {str(e)}")
+        logger.error("Logout error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Logout failed"
@@ -223,7 +288,7 @@ def refresh_tokens(refresh_token: str, db: Session) -> dict:
             )
             
         email = payload.get("sub")
-        advisor = db.query(FinancialAdvisor).filter_by(email=email).first()
+        advisor = resolve_advisor(email, db)
         if not advisor:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -238,7 +303,7 @@ def refresh_tokens(refresh_token: str, db: Session) -> dict:
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Token refresh error: {str(e)}")
+        logger.error("Token refresh error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not refresh token"
@@ -0,0 +1,343 @@
+# services/broadcast_service.py
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import select, update, insert, func, or_, and_, exists
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.database import AsyncSessionLocal, BroadcastJob, BroadcastRecipient, User
+from services.messaging_service import send_broadcast_message
+
+logger = logging.getLogger(__name__)
+
+# Identifies this process as the owner of the jobs it drains
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+BROADCAST_WORKERS = int(os.getenv("BROADCAST_WORKERS", 2))  # jobs drained at once per process
+BROADCAST_SENDERS = int(os.getenv("BROADCAST_SENDERS", 20))  # in-flight sends per job
+BROADCAST_BATCH_SIZE = int(os.getenv("BROADCAST_BATCH_SIZE", 100))
+HEARTBEAT_INTERVAL = 15  # seconds
+LEASE_TIMEOUT = 60  # seconds without a heartbeat before another worker may take a job over
+RESCAN_INTERVAL = LEASE_TIMEOUT  # seconds between scans for jobs whose lease has run out
+RETRY_DELAY = 30  # seconds before a job that hit an error is picked up again
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+def _audience_filter(job: BroadcastJob):
+    conditions = [User.advisor_id == job.advisor_id]
+    if job.user_ids:
+        conditions.append(User.id.in_(job.user_ids))
+    return conditions
+
+
+async def create_broadcast_job(db: AsyncSession, content_sid: str, advisor_id: int,
+                               user_ids: Optional[List[int]] = None) -> BroadcastJob:
+    """
+    Persist a broadcast job. Recipients are not resolved here: the worker
+    streams them and fills in the total, so the request returns at once.
+    """
+    logger.info("Creating broadcast job for advisor_id: %s", advisor_id)
+    job = BroadcastJob(
+        advisor_id=advisor_id,
+        content_sid=content_sid,
+        user_ids=list(user_ids) if user_ids else None,
+        status="queued",
+    )
+    db.add(job)
+    await db.commit()
+    logger.info("Broadcast job %s queued", job.id)
+    return job
+
+
+async def get_broadcast_status(db: AsyncSession, job_id: int) -> Optional[dict]:
+    job = await db.get(BroadcastJob, job_id)
+    if job is None:
+        return None
+    result = await db.execute(
+        select(BroadcastRecipient.status, func.count())
+        .where(BroadcastRecipient.job_id == job_id)
+        .group_by(BroadcastRecipient.status)
+    )
+    counts = dict(result.all())
+    sent, failed = counts.get("sent", 0), counts.get("failed", 0)
+    return {
+        "job_id": job.id,
+        "advisor_id": job.advisor_id,
+        "status": job.status,
+        "total": job.total,
+        "sent": sent,
+        "failed": failed,
+        "pending": max(job.total - sent - failed, 0) if job.total is not None else None,
+        "created_at": job.created_at,
+        "finished_at": job.finished_at,
+    }
+
+
+class BroadcastEngine:
+    """
+    Drains persisted broadcast jobs in the background.
+
+    A job is owned by one process at a time through its owner/heartbeat_at
+    columns. Each recipient's outcome is written as a broadcast_recipients
+    row, so a job resumed after a restart only sends to users that have no
+    outcome yet. Sends that were in flight when a process died are retried,
+    i.e. delivery is at-least-once. Besides the scan at startup, every
+    process rescans for claimable jobs every RESCAN_INTERVAL, so jobs whose
+    owner died (or restarted under a new WORKER_ID) are taken over once
+    their lease runs out.
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal, workers: int = BROADCAST_WORKERS,
+                 senders: int = BROADCAST_SENDERS, batch_size: int = BROADCAST_BATCH_SIZE):
+        self.session_factory = session_factory
+        self.workers = workers
+        self.senders = senders
+        self.batch_size = batch_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._known: Set[int] = set()  # queued or being drained by this process
+        # Metrics
+        self.running_jobs = 0
+        self.jobs_completed = 0
+        self.messages_sent = 0
+        self.messages_failed = 0
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._heartbeat()))
+        logger.info("Broadcast engine started as %s with %s workers", WORKER_ID, self.workers)
+        await self.resume()
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._known.clear()
+        # Hand unfinished jobs back so another process can take them over at once
+        async with self.session_factory() as db:
+            await db.execute(
+                update(BroadcastJob)
+                .where(BroadcastJob.owner == WORKER_ID, BroadcastJob.status.in_(ACTIVE_STATUSES))
+                .values(owner=None, heartbeat_at=None)
+            )
+            await db.commit()
+        logger.info("Broadcast engine stopped")
+
+    def submit(self, job_id: int) -> bool:
+        """Queue a job unless this process already has it queued or running."""
+        if self._queue is None:
+            logger.warning("Broadcast engine not running; job %s will run on next resume", job_id)
+            return False
+        if job_id in self._known:
+            return False
+        self._known.add(job_id)
+        self._queue.put_nowait(job_id)
+        return True
+
+    async def resume(self):
+        """Queue every unfinished job that no live worker owns."""
+        async with self.session_factory() as db:
+            result = await db.execute(
+                select(BroadcastJob.id)
+                .where(BroadcastJob.status.in_(ACTIVE_STATUSES), self._claimable())
+                .order_by(BroadcastJob.id)
+            )
+            job_ids = result.scalars().all()
+        resumed = [job_id for job_id in job_ids if self.submit(job_id)]
+        if resumed:
+            logger.info("Resuming broadcast jobs: %s", resumed)
+
+    def _claimable(self):
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=LEASE_TIMEOUT)
+        return or_(
+            BroadcastJob.owner.is_(None),
+            BroadcastJob.owner == WORKER_ID,
+            BroadcastJob.heartbeat_at < cutoff,
+        )
+
+    async def _claim(self, db: AsyncSession, job_id: int) -> bool:
+        result = await db.execute(
+            update(BroadcastJob)
+            .where(BroadcastJob.id == job_id, BroadcastJob.status.in_(ACTIVE_STATUSES), self._claimable())
+            .values(owner=WORKER_ID, heartbeat_at=datetime.now(timezone.utc), status="running")
+        )
+        await db.commit()
+        return result.rowcount == 1
+
+    async def _worker(self, index: int):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run_job(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Broadcast job %s failed on %s: %s", job_id, WORKER_ID, e)
+                asyncio.get_running_loop().call_later(RETRY_DELAY, self.submit, job_id)
+            finally:
+                self._known.discard(job_id)
+                self._queue.task_done()
+
+    async def _heartbeat(self):
+        last_rescan = time.monotonic()
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            if time.monotonic() - last_rescan >= RESCAN_INTERVAL:
+                last_rescan = time.monotonic()
+                try:
+                    await self.resume()
+                except Exception as e:
+                    logger.error("Broadcast rescan failed: %s", e)
+            try:
+                async with self.session_factory() as db:
+                    await db.execute(
+                        update(BroadcastJob)
+                        .where(BroadcastJob.owner == WORKER_ID, BroadcastJob.status == "running")
+                        .values(heartbeat_at=datetime.now(timezone.utc))
+                    )
+                    await db.commit()
+            except Exception as e:
+                logger.error("Broadcast heartbeat failed: %s", e)
+
+    async def _run_job(self, job_id: int):
+        self.running_jobs += 1
+        try:
+            await self._drain_job(job_id)
+        finally:
+            self.running_jobs -= 1
+
+    async def _drain_job(self, job_id: int):
+        async with self.session_factory() as db:
+            if not await self._claim(db, job_id):
+                logger.info("Broadcast job %s is finished or owned by another worker", job_id)
+                return
+            job = await db.get(BroadcastJob, job_id)
+        logger.info("Draining broadcast job %s for advisor_id: %s", job_id, job.advisor_id)
+
+        # Bounded pipeline: one streaming producer feeds a fixed pool of senders,
+        # so memory stays flat however many users the advisor has
+        queue = asyncio.Queue(maxsize=self.senders * 2)
+        recorder = OutcomeRecorder(self.session_factory, self.batch_size)
+        tasks = [asyncio.create_task(self._sender(queue, job, recorder)) for _ in range(self.senders)]
+        if job.total is None:
+            tasks.append(asyncio.create_task(self._record_total(job)))
+        try:
+            await self._produce(queue, job)
+            for _ in range(self.senders):
+                await queue.put(None)
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        finally:
+            await recorder.flush()
+
+        async with self.session_factory() as db:
+            await db.execute(
+                update(BroadcastJob)
+                .where(BroadcastJob.id == job_id)
+                .values(status="completed", owner=None, finished_at=datetime.now(timezone.utc))
+            )
+            await db.commit()
+        self.jobs_completed += 1
+        logger.info("Broadcast job %s completed: %s sent, %s failed", job_id, recorder.sent, recorder.failed)
+
+    async def _produce(self, queue: asyncio.Queue, job: BroadcastJob):
+        """Stream users without a recorded outcome through a server-side cursor."""
+        already_done = exists().where(
+            and_(BroadcastRecipient.job_id == job.id, BroadcastRecipient.user_id == User.id)
+        )
+        stmt = (
+            select(User.id, User.name, User.mobile_number)
+            .where(*_audience_filter(job), ~already_done)
+            .order_by(User.id)
+            .execution_options(yield_per=self.batch_size)
+        )
+        # A dedicated session: its connection stays busy until the cursor is drained
+        async with self.session_factory() as db:
+            result = await db.stream(stmt)
+            async for row in result:
+                await queue.put(row)
+
+    async def _sender(self, queue: asyncio.Queue, job: BroadcastJob, recorder: "OutcomeRecorder"):
+        while True:
+            row = await queue.get()
+            if row is None:
+                return
+            outcome = {"job_id": job.id, "user_id": row.id, "created_at": datetime.now(timezone.utc)}
+            try:
+                sid = await send_broadcast_message(job.content_sid, row.name, row.mobile_number)
+                outcome.update(status="sent", message_sid=sid, error=None)
+                self.messages_sent += 1
+            except Exception as e:
+                self.messages_failed += 1
+                logger.error("Failed to send message to %s: %s", row.mobile_number, e)
+                outcome.update(status="failed", message_sid=None, error=str(e)[:255])
+            await recorder.record(outcome)
+
+    async def _record_total(self, job: BroadcastJob):
+        async with self.session_factory() as db:
+            total = await db.scalar(select(func.count()).select_from(User).where(*_audience_filter(job)))
+            await db.execute(update(BroadcastJob).where(BroadcastJob.id == job.id).values(total=total))
+            await db.commit()
+        logger.info("Broadcast job %s has %s recipients", job.id, total)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "queued_jobs": self._queue.qsize() if self._queue is not None else 0,
+            "running_jobs": self.running_jobs,
+            "jobs_completed": self.jobs_completed,
+            "messages_sent": self.messages_sent,
+            "messages_failed": self.messages_failed,
+        }
+
+
+class OutcomeRecorder:
+    """Buffers per-recipient outcomes and writes them in bulk inserts."""
+
+    FLUSH_INTERVAL = 1.0  # seconds
+
+    def __init__(self, session_factory, batch_size: int):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.sent = 0
+        self.failed = 0
+        self._buffer: List[dict] = []
+        self._lock = asyncio.Lock()
+        self._last_flush = time.monotonic()
+
+    async def record(self, outcome: dict):
+        self._buffer.append(outcome)
+        if outcome["status"] == "sent":
+            self.sent += 1
+        else:
+            self.failed += 1
+        if len(self._buffer) >= self.batch_size or time.monotonic() - self._last_flush >= self.FLUSH_INTERVAL:
+            await self.flush()
+
+    async def flush(self):
+        async with self._lock:
+            if not self._buffer:
+                return
+            outcomes, self._buffer = self._buffer, []
+            self._last_flush = time.monotonic()
+            async with self.session_factory() as db:
+                await db.execute(
+                    insert(BroadcastRecipient).prefix_with("IGNORE", dialect="mysql"),
+                    outcomes,
+                )
+                await db.commit()
+
+
+broadcast_engine = BroadcastEngine()
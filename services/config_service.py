@@ -1,13 +1,75 @@
 # app/services/config_service.py
 from models.config_model import ContentSIDsRequest, ContentSIDsResponse
+from models.database import AdvisorMessagingSettings
+from dataclasses import dataclass, replace
+from typing import Optional
 import os
-from dotenv import load_dotenv, set_key
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException
 import logging
+from services.config_store import Settings, config_store
+from services.ttl_cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
-ENV_FILE_PATH = ".env"
+# Per-advisor messaging settings; update_content_sids writes through to this cache
+messaging_settings_cache = TTLCache(
+    maxsize=int(os.getenv("ADVISOR_MESSAGING_CACHE_SIZE", 1024)),
+    ttl=float(os.getenv("ADVISOR_MESSAGING_CACHE_TTL", 300)),
+)
+
+@dataclass(frozen=True)
+class AdvisorMessaging:
+    """Detached copy of an advisor's messaging settings; None means use the global value."""
+    advisor_id: int
+    first_content_sid: Optional[str] = None
+    last_content_sid: Optional[str] = None
+    messaging_service_sid: Optional[str] = None
+    from_number: Optional[str] = None
+
+    @classmethod
+    def from_row(cls, advisor_id: int, row: Optional[AdvisorMessagingSettings]) -> "AdvisorMessaging":
+        if row is None:
+            return cls(advisor_id=advisor_id)
+        return cls(
+            advisor_id=advisor_id,
+            first_content_sid=row.first_content_sid,
+            last_content_sid=row.last_content_sid,
+            messaging_service_sid=row.messaging_service_sid,
+            from_number=row.from_number,
+        )
+
+    def resolve(self, settings: Settings) -> "AdvisorMessaging":
+        """Fill unset values from the global config snapshot."""
+        return replace(
+            self,
+            first_content_sid=self.first_content_sid or settings.first_content_sid,
+            last_content_sid=self.last_content_sid or settings.last_content_sid,
+            messaging_service_sid=self.messaging_service_sid or settings.messaging_service_sid,
+            from_number=self.from_number or settings.twilio_phone_number,
+        )
+
+def get_advisor_messaging(db: Session, advisor_id: int) -> AdvisorMessaging:
+    """Effective messaging settings for an advisor; hits the database only on a cache miss."""
+    messaging = messaging_settings_cache.get(advisor_id)
+    if messaging is None:
+        row = db.get(AdvisorMessagingSettings, advisor_id)
+        messaging = AdvisorMessaging.from_row(advisor_id, row)
+        messaging_settings_cache.set(advisor_id, messaging)
+    return messaging.resolve(config_store.current)
+
+async def get_advisor_messaging_async(db: AsyncSession, advisor_id: int) -> AdvisorMessaging:
+    """Async variant of get_advisor_messaging for the webhook."""
+    messaging = messaging_settings_cache.get(advisor_id)
+    if messaging is None:
+        result = await db.execute(
+            select(AdvisorMessagingSettings).where(AdvisorMessagingSettings.advisor_id == advisor_id)
+        )
+        messaging = AdvisorMessaging.from_row(advisor_id, result.scalars().first())
+        messaging_settings_cache.set(advisor_id, messaging)
+    return messaging.resolve(config_store.current)
 
 class ConfigService:
     @staticmethod
@@ -16,47 +78,56 @@ class ConfigService:
         return value.strip("'\"")
 
     @staticmethod
-    def get_content_sids() -> ContentSIDsResponse:
-        logger.info("Fetching content SIDs from .env")
+    def _response(message: str, messaging: AdvisorMessaging) -> ContentSIDsResponse:
+        return ContentSIDsResponse(
+            success=True,
+            message=message,
+            first_content_sid=messaging.first_content_sid,
+            last_content_sid=messaging.last_content_sid,
+            messaging_service_sid=messaging.messaging_service_sid,
+            from_number=messaging.from_number
+        )
+
+    @staticmethod
+    def get_content_sids(db: Session, advisor_id: int) -> ContentSIDsResponse:
+        logger.info("Fetching content SIDs for advisor_id: %s", advisor_id)
         try:
-            load_dotenv(ENV_FILE_PATH)
-            first_sid = os.getenv("FIRST_CONTENT_SID")
-            
-            if not first_sid:
-                raise HTTPException(
-                    status_code=404,
-                    detail="Content SIDs not found"
-                )
-            
-            return ContentSIDsResponse(
-                success=True,
-                message="Content SIDs retrieved successfully",
-                first_content_sid=first_sid
-            )
+            messaging = get_advisor_messaging(db, advisor_id)
         except Exception as e:
-            logger.error(f"Error fetching content SIDs: {str(e)}")
+            logger.error("Error fetching content SIDs: %s", e)
             raise HTTPException(status_code=500, detail=str(e))
 
+        if not messaging.first_content_sid:
+            raise HTTPException(
+                status_code=404,
+                detail="Content SIDs not found"
+            )
+        return ConfigService._response("Content SIDs retrieved successfully", messaging)
+
     @staticmethod
-    def update_content_sids(request: ContentSIDsRequest) -> ContentSIDsResponse:
-        logger.info("Updating FIRST_CONTENT_SID and LAST_CONTENT_SID in .env")
-        
-        if not os.path.exists(ENV_FILE_PATH):
-            logger.error(".env file not found")
-            raise HTTPException(status_code=500, detail=".env file not found")
-        
+    def update_content_sids(db: Session, advisor_id: int, request: ContentSIDsRequest) -> ContentSIDsResponse:
+        logger.info("Updating content SIDs for advisor_id: %s", advisor_id)
         try:
-            clean_first_sid = ConfigService._clean_value(request.first_content_sid)
-            
-            set_key(ENV_FILE_PATH, "FIRST_CONTENT_SID", clean_first_sid, quote_mode="never")
-            
-            load_dotenv(ENV_FILE_PATH, override=True)
-            
-            return ContentSIDsResponse(
-                success=True,
-                message="Content SIDs updated successfully",
-                first_content_sid=clean_first_sid
+            values = {
+                key: ConfigService._clean_value(value) if isinstance(value, str) else value
+                for key, value in request.model_dump(exclude_unset=True).items()
+            }
+            row = db.get(AdvisorMessagingSettings, advisor_id, with_for_update=True)
+            if row is None:
+                row = AdvisorMessagingSettings(advisor_id=advisor_id)
+                db.add(row)
+            for key, value in values.items():
+                setattr(row, key, value)
+            db.commit()
+
+            # Write-through so this worker serves the new templates immediately
+            messaging = AdvisorMessaging.from_row(advisor_id, row)
+            messaging_settings_cache.set(advisor_id, messaging)
+            return ConfigService._response(
+                "Content SIDs updated successfully", messaging.resolve(config_store.current)
             )
         except Exception as e:
-            logger.error(f"Error updating .env file: {str(e)}")
-            raise HTTPException(status_code=500, detail="Failed to update .env file")
\ No newline at end of file
+            db.rollback()
+            messaging_settings_cache.invalidate(advisor_id)
+            logger.error("Error updating content SIDs for advisor_id %s: %s", advisor_id, e)
+            raise HTTPException(status_code=500, detail="Failed to update content SIDs")
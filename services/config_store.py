@@ -0,0 +1,109 @@
+# services/config_store.py
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Mapping, Optional
+
+from dotenv import dotenv_values
+
+logger = logging.getLogger(__name__)
+
+ENV_FILE_PATH = ".env"
+
+# Settings field -> environment variable
+ENV_KEYS = {
+    "twilio_account_sid": "TWILIO_ACCOUNT_SID",
+    "twilio_auth_token": "TWILIO_AUTH_TOKEN",
+    "twilio_phone_number": "TWILIO_PHONE_NUMBER",
+    "messaging_service_sid": "MESSAGING_SERVICE_SID",
+    "first_content_sid": "FIRST_CONTENT_SID",
+    "last_content_sid": "LAST_CONTENT_SID",
+    "captcha_secret_key": "CAPTCHA_SECRET_KEY",
+    "captcha_url": "CAPTCHA_URL",
+}
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Immutable snapshot of the runtime-reloadable configuration."""
+    version: int
+    loaded_at: float
+    twilio_account_sid: Optional[str] = None
+    twilio_auth_token: Optional[str] = None
+    twilio_phone_number: Optional[str] = None
+    messaging_service_sid: Optional[str] = None
+    first_content_sid: Optional[str] = None
+    last_content_sid: Optional[str] = None
+    captcha_secret_key: Optional[str] = None
+    captcha_url: Optional[str] = None
+
+    @classmethod
+    def from_mapping(cls, values: Mapping[str, Optional[str]], version: int) -> "Settings":
+        return cls(
+            version=version,
+            loaded_at=time.time(),
+            **{name: values.get(key) or None for name, key in ENV_KEYS.items()},
+        )
+
+    def same_values(self, other: "Settings") -> bool:
+        return all(getattr(self, name) == getattr(other, name) for name in ENV_KEYS)
+
+    def changed(self, other: "Settings") -> List[str]:
+        return [name for name in ENV_KEYS if getattr(self, name) != getattr(other, name)]
+
+
+Subscriber = Callable[[Settings, Settings], None]
+
+
+class ConfigStore:
+    """
+    Holds the current Settings snapshot and swaps it atomically on reload.
+
+    Readers take `config_store.current` once and use its attributes: a plain
+    attribute read, never os.getenv or the filesystem, and always a
+    consistent set of values. reload() rebuilds the snapshot from the
+    process environment captured at startup overlaid with the .env file
+    (the same precedence as load_dotenv(override=True)) without mutating
+    os.environ. Subscribers are called with (old, new) after each swap that
+    changed something, e.g. to rebuild clients whose credentials changed.
+    """
+
+    def __init__(self, env_file: str = ENV_FILE_PATH):
+        self.env_file = env_file
+        self._base_env = dict(os.environ)
+        self._lock = threading.Lock()
+        self._subscribers: List[Subscriber] = []
+        self.current = Settings.from_mapping(self._read(), version=1)
+
+    def _read(self) -> Mapping[str, Optional[str]]:
+        values = dict(self._base_env)
+        if os.path.exists(self.env_file):
+            values.update({key: value for key, value in dotenv_values(self.env_file).items() if value is not None})
+        return values
+
+    @property
+    def version(self) -> int:
+        return self.current.version
+
+    def subscribe(self, callback: Subscriber):
+        self._subscribers.append(callback)
+
+    def reload(self) -> Settings:
+        with self._lock:
+            old = self.current
+            new = Settings.from_mapping(self._read(), version=old.version + 1)
+            if new.same_values(old):
+                return old
+            self.current = new
+        logger.info("Configuration reloaded as version %s; changed: %s", new.version, ", ".join(new.changed(old)))
+        for callback in self._subscribers:
+            try:
+                callback(old, new)
+            except Exception as e:
+                logger.error("Config subscriber %r failed: %s", callback, e)
+        return new
+
+
+config_store = ConfigStore()
@@ -0,0 +1,165 @@
+# services/logging_pipeline.py
+import itertools
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()  # json | text
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", 10 * 1024 * 1024))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", 5))
+# Comma-separated logger=rate pairs, e.g. "services.messaging_service=0.1,routers.users=0.5"
+LOG_SAMPLING = os.getenv("LOG_SAMPLING", "")
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Bearer tokens / JWTs first, then phone-shaped tokens: whatsapp:-prefixed,
+# +-prefixed, or a bare run of 10-15 digits (not part of a time, list or id)
+_TOKEN_RE = re.compile(r"\beyJ[\w-]+\.[\w-]+\.[\w-]+|(?i:bearer\s+)[\w.~+/=-]+")
+_PHONE_RE = re.compile(
+    r"whatsapp:\+?\d{7,15}(?!\d)"
+    r"|(?<![\w+])\+\d(?:[\s-]?\d){6,14}(?!\d)"
+    r"|(?<![\w:,.+-])\d{10,15}(?![\w:,.-])"
+)
+
+
+def redact(text: str) -> str:
+    """Mask bearer tokens and phone numbers, keeping the last 4 digits of a number."""
+    text = _TOKEN_RE.sub("[REDACTED_TOKEN]", text)
+    return _PHONE_RE.sub(_mask_phone, text)
+
+
+def _mask_phone(match: re.Match) -> str:
+    return "***" + re.sub(r"\D", "", match.group(0))[-4:]
+
+
+class RedactingFormatter(logging.Formatter):
+    """
+    Text formatter that redacts the message and exception text before
+    rendering, so the timestamp and other format fields are left intact.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        # Work on a copy; other handlers may format the same record
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg, record.args = redact(record.getMessage()), None
+        if record.exc_info:
+            record.exc_text = redact(self.formatException(record.exc_info))
+        if record.stack_info:
+            record.stack_info = redact(record.stack_info)
+        return super().format(record)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; the message is redacted after lazy %-formatting."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": redact(record.getMessage()),
+            "thread": record.threadName,
+        }
+        if record.exc_info:
+            entry["exc_info"] = redact(self.formatException(record.exc_info))
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps a fixed fraction of sub-WARNING records per logger (and its
+    children); warnings and errors always pass. Sampling is a counter, not
+    random, so 0.1 keeps exactly every tenth record.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._counters: Dict[str, "itertools.count"] = {}
+        self._resolved: Dict[str, Optional[str]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_spec(cls, spec: str) -> "SamplingFilter":
+        rates = {}
+        for item in filter(None, (part.strip() for part in spec.split(","))):
+            name, _, rate = item.partition("=")
+            rates[name.strip()] = min(max(float(rate), 0.0), 1.0)
+        return cls(rates)
+
+    def _rule(self, name: str) -> Optional[str]:
+        rule = self._resolved.get(name, False)
+        if rule is False:
+            rule = next(
+                (prefix for prefix in sorted(self.rates, key=len, reverse=True)
+                 if name == prefix or name.startswith(prefix + ".")),
+                None,
+            )
+            self._resolved[name] = rule
+        return rule
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        rule = self._rule(record.name)
+        if rule is None:
+            return True
+        rate = self.rates[rule]
+        if rate <= 0:
+            return False
+        with self._lock:
+            counter = self._counters.setdefault(rule, itertools.count())
+            n = next(counter)
+        # Keep record n when it crosses the next multiple of 1/rate
+        return int(n * rate) != int((n + 1) * rate) or rate >= 1
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that hands the record over unformatted. The stock prepare()
+    renders the message in the calling thread; here %-formatting, redaction
+    and JSON encoding all happen on the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def setup_logging(log_dir: str = "logs", level: str = LOG_LEVEL, fmt: str = LOG_FORMAT,
+                  sampling: str = LOG_SAMPLING) -> logging.handlers.QueueListener:
+    """
+    Route every record through a queue to a background listener that writes
+    to stderr and a size-rotated file. Returns the started listener; stop()
+    it at shutdown to flush what is still queued.
+    """
+    os.makedirs(log_dir, exist_ok=True)
+    formatter = JsonFormatter() if fmt == "json" else RedactingFormatter(TEXT_FORMAT)
+
+    stream_handler = logging.StreamHandler()
+    file_handler = logging.handlers.RotatingFileHandler(
+        os.path.join(log_dir, "app.log"), maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8"
+    )
+    for handler in (stream_handler, file_handler):
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(log_queue)
+    if sampling:
+        queue_handler.addFilter(SamplingFilter.from_spec(sampling))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    listener = logging.handlers.QueueListener(log_queue, stream_handler, file_handler, respect_handler_level=True)
+    listener.start()
+    return listener
@@ -1,57 +1,33 @@
-from twilio.rest import Client
 from twilio.twiml.messaging_response import MessagingResponse
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from models.database import DecisionTreeQuestion, UserReply, User
+from models.database import DecisionTreeQuestion, UserReply
 import json
 import logging
 import os
-import asyncio
 from fastapi import Request, Response
 from typing import List, Optional, Dict, Any
 from services.session_manager import session_manager
-import time
-import aiohttp
+from services.question_cache import question_cache, CachedQuestion, QuestionTree
+from services.twilio_transport import TwilioTransportError, twilio_transport
+from services.rate_limiter import KeyedRateLimiter
+from services.user_service import reply_cache
+from services.reply_writer import reply_writer
+from services.outbox import OutboxMessage, outbox
+from services.config_store import config_store
+from services.config_service import get_advisor_messaging_async
+from services.metrics import RATE_LIMIT_WAIT_SECONDS
 from contextlib import asynccontextmanager
 
 logger = logging.getLogger(__name__)
 
 # Constants for rate limiting
-MAX_REQUESTS_PER_SECOND = 5  # Adjust based on Twilio's rate limits
+MAX_REQUESTS_PER_SECOND = int(os.getenv("TWILIO_MAX_REQUESTS_PER_SECOND", 5))  # Adjust based on Twilio's rate limits
 REQUEST_WINDOW = 1.0  # seconds
+REQUEST_BURST = int(os.getenv("TWILIO_REQUEST_BURST", MAX_REQUESTS_PER_SECOND))
 
-# Rate limiter for Twilio requests
-class RateLimiter:
-    def __init__(self, max_requests: int, window: float):
-        self.max_requests = max_requests
-        self.window = window
-        self.timestamps = []
-        self._lock = asyncio.Lock()
-    
-    async def acquire(self):
-        async with self._lock:
-            now = time.time()
-            # Remove timestamps outside the window
-            self.timestamps = [ts for ts in self.timestamps if now - ts <= self.window]
-            
-            if len(self.timestamps) >= self.max_requests:
-                # Wait until we can make another request
-                sleep_time = self.timestamps[0] + self.window - now
-                if sleep_time > 0:
-                    await asyncio.sleep(sleep_time)
-                    # Recalculate after sleeping
-                    now = time.time()
-                    self.timestamps = [ts for ts in self.timestamps if now - ts <= self.window]
-            
-            self.timestamps.append(now)
-
-# Initialize Twilio client
-account_sid = os.getenv("TWILIO_ACCOUNT_SID")
-auth_token = os.getenv("TWILIO_AUTH_TOKEN")
-client = Client(account_sid, auth_token)
-
-# Initialize rate limiter
-twilio_rate_limiter = RateLimiter(MAX_REQUESTS_PER_SECOND, REQUEST_WINDOW)
+# Rate limiter for Twilio requests, one bucket per messaging service / sender
+twilio_rate_limiter = KeyedRateLimiter(MAX_REQUESTS_PER_SECOND, REQUEST_WINDOW, REQUEST_BURST)
 
 async def handle_webhook(db: AsyncSession, request: Request) -> Response:
     logger.info("Received webhook request")
@@ -60,27 +36,50 @@ async def handle_webhook(db: AsyncSession, request: Request) -> Response:
     try:
         # Parse incoming form data from Twilio
         form_data = await request.form()
-        logger.info(f"Received form data: {dict(form_data)}")
 
         incoming_msg = form_data.get("Body", "").strip().lower()
         from_number = form_data.get("From", "").replace("whatsapp:", "")
-        logger.info(f"Processed webhook message from {from_number}: {incoming_msg}")
+        logger.info("Processed webhook message from %s", from_number)
+        logger.debug("Webhook message body from %s: %s", from_number, incoming_msg)
 
 
 
         # Access user session
         async with get_user_session(from_number) as user_data:
 
-            def final_msg():
-                final_content_sid = os.getenv('LAST_CONTENT_SID')
-                client.messages.create( content_sid=final_content_sid,
-                                        from_=f"whatsapp:{from_number}",
-                                        content_variables=json.dumps({"1": f"{user_data['salutation']} {user_data['first_name']}"}), 
-                                        to=f"whatsapp:{user_data['mobile_number']}", 
-                                        )
+            async def final_msg():
+                # Delivered by the outbox so the TwiML response is not held up by Twilio
+                messaging = await get_advisor_messaging_async(db, user_data["advisor_id"])
+                final_content_sid = messaging.last_content_sid
+                business_number = messaging.from_number
+                if not final_content_sid or not business_number:
+                    logger.error("Twilio configuration missing for advisor %s: last content SID or sender "
+                                 "number not set", user_data["advisor_id"])
+                    return
+                message = OutboxMessage(
+                    kind="completion",
+                    content_sid=final_content_sid,
+                    from_=f"whatsapp:{business_number}",
+                    messaging_service_sid=messaging.messaging_service_sid,
+                    content_variables=json.dumps({"1": user_data["name"]}),
+                    to=f"whatsapp:{user_data['mobile_number']}",
+                )
+                if outbox.enqueue(message):
+                    return
+                # Outbox full or stopped: send once inline rather than lose the message
+                try:
+                    await twilio_transport.send_message(
+                        to=message.to,
+                        from_=message.from_,
+                        content_sid=message.content_sid,
+                        content_variables=message.content_variables,
+                        messaging_service_sid=message.messaging_service_sid,
+                    )
+                except TwilioTransportError as e:
+                    logger.error("Failed to send completion message to %s: %s", message.to, e)
 
             if not user_data:
-                logger.warning(f"No session found for {from_number}")
+                logger.warning("No session found for %s", from_number)
                 twiml_response.message("Please submit the form to start the session.")
                 return Response(content=str(twiml_response), media_type="application/xml")
 
@@ -94,15 +93,15 @@ async def handle_webhook(db: AsyncSession, request: Request) -> Response:
 
                     if first_question:
                         twiml_response.message(body=first_question.question)
-                        logger.info(f"Started session for {from_number} with step 1")
+                        logger.info("Started session for %s with step 1", from_number)
                     else:
                         twiml_response.message("No questions found for the selected advisor.")
-                        session_manager.cleanup_sessions()
-                        logger.warning(f"No questions found for advisor {advisor_id}")
+                        session_manager.clear_session(from_number)
+                        logger.warning("No questions found for advisor %s", advisor_id)
 
                     return Response(content=str(twiml_response), media_type="application/xml")
                 except Exception as e:
-                    logger.error(f"Error starting session: {str(e)}")
+                    logger.error("Error starting session: %s", e)
                     twiml_response.message("An error occurred while starting the session.")
                     return Response(content=str(twiml_response), media_type="application/xml")
 
@@ -116,7 +115,7 @@ async def handle_webhook(db: AsyncSession, request: Request) -> Response:
                     if not current_question:
                         twiml_response.message("No questions found for the selected advisor.")
                         session_manager.clear_session(from_number)
-                        logger.warning(f"No question found for step {current_step}")
+                        logger.warning("No question found for step %s", current_step)
                         return Response(content=str(twiml_response), media_type="application/xml")
 
                     # ==== ✅ Predefined Answer Question ====
@@ -128,26 +127,30 @@ async def handle_webhook(db: AsyncSession, request: Request) -> Response:
                             if next_question:
                                 session_manager.set_session(from_number, {**user_data, "current_step": next_step})
                                 twiml_response.message(body=next_question.question)
-                                logger.info(f"Moved to step {next_step} for {from_number}")
+                                logger.info("Moved to step %s for %s", next_step, from_number)
                             else:
-                                final_msg()
+                                await final_msg()
                                 session_manager.clear_session(from_number)
-                                logger.info(f"Session completed for {from_number}")
+                                logger.info("Session completed for %s", from_number)
                         else:
                             twiml_response.message(f"Please respond with '{current_question.triggerKeyword}'.")
-                            logger.warning(f"Invalid trigger keyword from {from_number}: {incoming_msg}")
+                            logger.warning("Invalid trigger keyword from %s: %s", from_number, incoming_msg)
 
                     # ==== ✅ Open-ended Question ====
                     else:
                         try:
-                            new_reply = UserReply(
-                                user_id=user_data["id"],
-                                question_id=current_question.id,
-                                reply=incoming_msg
-                            )
-                            db.add(new_reply)
-                            db.commit()
-                            logger.info(f"Stored reply from {from_number} for question {current_question.id}")
+                            if reply_writer.submit(user_data["id"], current_question.id, incoming_msg, advisor_id):
+                                logger.info("Buffered reply from %s for question %s", from_number, current_question.id)
+                            else:
+                                new_reply = UserReply(
+                                    user_id=user_data["id"],
+                                    question_id=current_question.id,
+                                    reply=incoming_msg
+                                )
+                                db.add(new_reply)
+                                await db.commit()
+                                logger.info("Stored reply from %s for question %s", from_number, current_question.id)
+                            reply_cache.invalidate((advisor_id, user_data["id"]))
 
                             next_step = current_step + 1
                             next_question = await get_question(db, advisor_id, next_step)
@@ -155,29 +158,32 @@ async def handle_webhook(db: AsyncSession, request: Request) -> Response:
                             if next_question:
                                 session_manager.set_session(from_number, {**user_data, "current_step": next_step})
                                 twiml_response.message(body=next_question.question)
-                                logger.info(f"Advanced to step {next_step} for {from_number}")
+                                logger.info("Advanced to step %s for %s", next_step, from_number)
                             else:
-                                final_msg()
+                                await final_msg()
                                 session_manager.clear_session(from_number)
-                                logger.info(f"Session completed for {from_number}")
+                                logger.info("Session completed for %s", from_number)
                             
                         except Exception as e:
-                            db.rollback()
+                            await db.rollback()
+                            logger.error("Failed to store reply from %s for question %s: %s",
+                                         from_number, current_question.id, e)
+                            twiml_response.message("An error occurred while processing your response.")
 
                 except Exception as e:
-                    logger.error(f"Error handling step {current_step} for {from_number}: {str(e)}")
+                    logger.error("Error handling step %s for %s: %s", current_step, from_number, e)
                     twiml_response.message("An error occurred while processing your response.")
 
             # ==== Invalid Session State ====
             else:
                 twiml_response.message("Invalid session state. Please start again.")
                 session_manager.clear_session(from_number)
-                logger.warning(f"Invalid session state for {from_number}")
+                logger.warning("Invalid session state for %s", from_number)
 
         return Response(content=str(twiml_response), media_type="application/xml")
 
     except Exception as e:
-        logger.error(f"Unexpected error in webhook: {str(e)}")
+        logger.error("Unexpected error in webhook: %s", e)
         twiml_response.message("An unexpected error occurred.")
         return Response(content=str(twiml_response), media_type="application/xml")
 
@@ -188,86 +194,50 @@ async def get_user_session(from_number):
         user_data = session_manager.get_session(from_number)
         yield user_data
     except Exception as e:
-        logger.error(f"Error accessing session for {from_number}: {str(e)}")
+        logger.error("Error accessing session for %s: %s", from_number, e)
         yield None
 
-async def get_question(db: AsyncSession, advisor_id: int, step: int) -> Optional[DecisionTreeQuestion]:
-    logger.debug(f"Fetching question for advisor_id: {advisor_id}, step: {step}")
+async def get_question(db: AsyncSession, advisor_id: int, step: int) -> Optional[CachedQuestion]:
+    logger.debug("Fetching question for advisor_id: %s, step: %s", advisor_id, step)
     try:
-        stmt = select(DecisionTreeQuestion).where(
-            DecisionTreeQuestion.advisor_id == advisor_id,
-            DecisionTreeQuestion.step == step
-        )
-        # Use synchronous execution as in your original code
-        result = db.execute(stmt)  # No await here
-        question = result.scalars().first()
-        logger.debug(f"Question found for advisor_id: {advisor_id}, step: {step}: {question}")
+        tree = question_cache.get(advisor_id)
+        if tree is None:
+            tree = await load_question_tree(db, advisor_id)
+        question = tree.get(step)
         if not question:
-            logger.debug(f"No question found for advisor_id: {advisor_id}, step: {step}")
+            logger.debug("No question found for advisor_id: %s, step: %s", advisor_id, step)
         return question
     except Exception as e:
-        logger.error(f"Error fetching question for advisor_id: {advisor_id}, step: {step}: {str(e)}")
+        logger.error("Error fetching question for advisor_id: %s, step: %s: %s", advisor_id, step, e)
         return None
 
-async def send_message(db: AsyncSession, content_sid: str, advisor_id: int, user_ids: Optional[List[int]] = None) -> List[str]:
-    logger.info(f"Sending message to users for advisor_id: {advisor_id}")
-    message_sids = []
-    logger.info(f"list of user id from request:{user_ids}")
-    
-    try:
-        users_query = select(User).where(
-            User.advisor_id == advisor_id,
-            User.id.in_(user_ids) if user_ids else True
-        )
-        
-        # Use synchronous execution as in your original code
-        result = db.execute(users_query)  # No await here
-        users = result.scalars().all()
-        logger.info(f"List of users to send promotion:{users}")
-        
-        if not users:
-            logger.warning(f"No users found for advisor_id: {advisor_id}")
-            return message_sids
-
-        async def send_twilio_message(user):
-            try:
-                # Apply rate limiting
-                await twilio_rate_limiter.acquire()
-                
-                from_number = os.getenv("TWILIO_PHONE_NUMBER")
-                message_service_sid = os.getenv("MESSAGING_SERVICE_SID")
-                
-                # Use asyncio.to_thread for non-blocking I/O operations
-                message = await asyncio.to_thread(
-                    client.messages.create,
-                    content_sid=content_sid,
-                    from_=f"whatsapp:{from_number}",
-                    content_variables=json.dumps({"1": user.name}),
-                    messaging_service_sid=message_service_sid,
-                    to=f"whatsapp:{user.mobile_number}",
-                )
-                logger.info(f"Message sent to {user.mobile_number}, SID: {message.sid}")
-                return message.sid
-            except Exception as e:
-                logger.error(f"Failed to send message to {user.mobile_number}: {str(e)}")
-                return None
-
-        # Process users in chunks to prevent overwhelming the system
-        CHUNK_SIZE = 20
-        all_sids = []
-        
-        for i in range(0, len(users), CHUNK_SIZE):
-            user_chunk = users[i:i+CHUNK_SIZE]
-            chunk_sids = await asyncio.gather(*(send_twilio_message(user) for user in user_chunk if user))
-            all_sids.extend(chunk_sids)
-            
-            # Brief pause between chunks
-            if i + CHUNK_SIZE < len(users):
-                await asyncio.sleep(0.5)
-        
-        valid_sids = [sid for sid in all_sids if sid]
-        logger.info(f"Successfully sent {len(valid_sids)} messages for advisor_id: {advisor_id}")
-        return valid_sids
-    except Exception as e:
-        logger.error(f"Error in send_message for advisor_id: {advisor_id}: {str(e)}")
-        return message_sids
\ No newline at end of file
+async def load_question_tree(db: AsyncSession, advisor_id: int) -> QuestionTree:
+    """Load every question for an advisor in one query and cache the compiled tree."""
+    version = question_cache.version(advisor_id)
+    stmt = select(DecisionTreeQuestion).where(
+        DecisionTreeQuestion.advisor_id == advisor_id
+    ).order_by(DecisionTreeQuestion.step, DecisionTreeQuestion.id)
+    result = await db.execute(stmt)
+    tree = question_cache.put(advisor_id, result.scalars().all(), version)
+    logger.info("Loaded question tree for advisor_id: %s with %s steps", advisor_id, len(tree.steps))
+    return tree
+
+async def send_broadcast_message(content_sid: str, name: str, mobile_number: str) -> str:
+    """Send one rate-limited broadcast message and return its SID; raises on failure."""
+    settings = config_store.current
+    from_number = settings.twilio_phone_number
+    message_service_sid = settings.messaging_service_sid
+
+    # Apply rate limiting
+    waited = await twilio_rate_limiter.acquire(message_service_sid or from_number)
+    RATE_LIMIT_WAIT_SECONDS.observe(waited, "twilio")
+
+    message = await twilio_transport.send_message(
+        content_sid=content_sid,
+        from_=f"whatsapp:{from_number}",
+        content_variables=json.dumps({"1": name}),
+        messaging_service_sid=message_service_sid,
+        to=f"whatsapp:{mobile_number}",
+    )
+    logger.info("Message sent to %s, SID: %s", mobile_number, message.sid)
+    return message.sid
@@ -0,0 +1,221 @@
+# services/outbox.py
+import asyncio
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set
+
+from services.metrics import OUTBOX_DELIVERY_SECONDS
+from services.twilio_transport import TwilioTransport, TwilioTransportError, twilio_transport
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_WORKERS = int(os.getenv("OUTBOX_WORKERS", 4))
+OUTBOX_CAPACITY = int(os.getenv("OUTBOX_CAPACITY", 10000))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", 5))
+OUTBOX_RETRY_DELAY = float(os.getenv("OUTBOX_RETRY_DELAY", 2.0))  # seconds, doubled per attempt
+OUTBOX_MAX_RETRY_DELAY = 60.0
+OUTBOX_DRAIN_TIMEOUT = float(os.getenv("OUTBOX_DRAIN_TIMEOUT", 5.0))
+
+
+@dataclass
+class OutboxMessage:
+    """One pending Twilio send; the fields mirror TwilioTransport.send_message."""
+    to: str
+    from_: Optional[str] = None
+    body: Optional[str] = None
+    content_sid: Optional[str] = None
+    content_variables: Optional[str] = None
+    messaging_service_sid: Optional[str] = None
+    kind: str = "outbound"
+    attempts: int = 0
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+def _is_permanent(error: TwilioTransportError) -> bool:
+    # 4xx other than 429 means Twilio rejected the request itself; retrying will not help
+    return error.status is not None and 400 <= error.status < 500 and error.status != 429
+
+
+class Outbox:
+    """
+    In-process outbox for user-facing Twilio sends.
+
+    Request handlers enqueue a message once their DB work is committed and
+    return at once; a fixed pool of workers delivers it. Transient failures
+    (network errors, 429, 5xx) are retried with exponential backoff up to
+    max_attempts. enqueue() is safe to call from the event loop and from
+    threadpool (sync) routes; capacity is reserved under a lock before the
+    message is handed to the loop, so a full outbox is reported to the
+    caller as False instead of dropping the message later. Messages still queued when the process exits
+    are lost, so delivery is at-most-once across restarts.
+    """
+
+    def __init__(self, transport: TwilioTransport = twilio_transport, workers: int = OUTBOX_WORKERS,
+                 capacity: int = OUTBOX_CAPACITY, max_attempts: int = OUTBOX_MAX_ATTEMPTS,
+                 retry_delay: float = OUTBOX_RETRY_DELAY):
+        self.transport = transport
+        self.workers = workers
+        self.capacity = capacity
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._retry_handles: Set[asyncio.TimerHandle] = set()
+        self._slots = 0  # messages queued or on their way into the queue
+        self._slots_lock = threading.Lock()
+        # Metrics
+        self.enqueued = 0
+        self.delivered = 0
+        self.failed = 0
+        self.retried = 0
+        self.dropped = 0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+        self.total_latency = 0.0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._slots = 0
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info("Outbox started with %s workers", self.workers)
+
+    async def stop(self):
+        if not self._tasks:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=OUTBOX_DRAIN_TIMEOUT)
+        except asyncio.TimeoutError:
+            pass
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for handle in self._retry_handles:
+            handle.cancel()
+        undelivered = self._queue.qsize() + len(self._retry_handles)
+        self._retry_handles.clear()
+        if undelivered:
+            logger.error("Outbox stopped with %s undelivered messages", undelivered)
+        logger.info("Outbox stopped")
+
+    def enqueue(self, message: OutboxMessage) -> bool:
+        """Queue a message for delivery; False if the outbox is not running or full."""
+        if not self.running:
+            logger.error("Outbox not running; %s message to %s not queued", message.kind, message.to)
+            return False
+        if not self._reserve(message):
+            return False
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self._put(message)
+            return True
+        try:
+            self._loop.call_soon_threadsafe(self._put, message)
+        except RuntimeError:
+            self._release()
+            logger.error("Outbox loop closed; %s message to %s not queued", message.kind, message.to)
+            return False
+        return True
+
+    def _reserve(self, message: OutboxMessage) -> bool:
+        with self._slots_lock:
+            if self._slots >= self.capacity:
+                self.dropped += 1
+                full = True
+            else:
+                self._slots += 1
+                full = False
+        if full:
+            logger.error("Outbox full; dropping %s message to %s", message.kind, message.to)
+        return not full
+
+    def _release(self):
+        with self._slots_lock:
+            self._slots -= 1
+
+    def _put(self, message: OutboxMessage):
+        """Hand a message whose slot is already reserved to the workers; runs on the loop."""
+        if message.attempts == 0:
+            self.enqueued += 1
+        self._queue.put_nowait(message)
+
+    def _retry_later(self, message: OutboxMessage, delay: float):
+        def put():
+            self._retry_handles.discard(handle)
+            if self._reserve(message):
+                self._put(message)
+        handle = self._loop.call_later(delay, put)
+        self._retry_handles.add(handle)
+
+    async def _worker(self):
+        while True:
+            message = await self._queue.get()
+            self._release()
+            try:
+                await self._deliver(message)
+            except Exception as e:
+                logger.error("Outbox worker error: %s", e)
+            finally:
+                self._queue.task_done()
+
+    async def _deliver(self, message: OutboxMessage):
+        message.attempts += 1
+        try:
+            sent = await self.transport.send_message(
+                to=message.to,
+                from_=message.from_,
+                body=message.body,
+                content_sid=message.content_sid,
+                content_variables=message.content_variables,
+                messaging_service_sid=message.messaging_service_sid,
+            )
+        except TwilioTransportError as e:
+            if _is_permanent(e) or message.attempts >= self.max_attempts:
+                self.failed += 1
+                logger.error(
+                    "Giving up on %s message to %s after %s attempts: %s",
+                    message.kind, message.to, message.attempts, e
+                )
+                return
+            delay = min(self.retry_delay * 2 ** (message.attempts - 1), OUTBOX_MAX_RETRY_DELAY)
+            self.retried += 1
+            logger.warning("Retrying %s message to %s in %.1fs: %s", message.kind, message.to, delay, e)
+            self._retry_later(message, delay)
+            return
+
+        latency = time.monotonic() - message.enqueued_at
+        self.delivered += 1
+        self.last_latency = latency
+        self.max_latency = max(self.max_latency, latency)
+        self.total_latency += latency
+        OUTBOX_DELIVERY_SECONDS.observe(latency, message.kind)
+        logger.info("Delivered %s message to %s, SID: %s", message.kind, message.to, sent.sid)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "retry_scheduled": len(self._retry_handles),
+            "enqueued": self.enqueued,
+            "delivered": self.delivered,
+            "failed": self.failed,
+            "retried": self.retried,
+            "dropped": self.dropped,
+            "last_latency_ms": self.last_latency * 1000,
+            "max_latency_ms": self.max_latency * 1000,
+            "avg_latency_ms": self.total_latency / self.delivered * 1000 if self.delivered else 0.0,
+        }
+
+
+outbox = Outbox()
@@ -0,0 +1,92 @@
+# services/password_hasher.py
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+logger = logging.getLogger(__name__)
+
+# hashlib's pbkdf2/scrypt release the GIL, so a small thread pool gives real parallelism
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+PASSWORD_HASH_MAX_WAITING = int(os.getenv("PASSWORD_HASH_MAX_WAITING", 32))
+PASSWORD_HASH_QUEUE_TIMEOUT = float(os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT", 2.0))
+
+
+class PasswordPoolBusy(Exception):
+    """Raised when a hashing job cannot get a worker in time."""
+
+
+class PasswordHasher:
+    """
+    Runs password hashing and verification on a dedicated, bounded pool.
+
+    At most `workers` hashes run at once, off the event loop. Callers beyond
+    that wait for a slot up to queue_timeout seconds. Once max_waiting callers
+    are already queued, new ones are rejected immediately, so a burst of
+    logins costs bounded CPU and never stalls other requests.
+    """
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_waiting: int = PASSWORD_HASH_MAX_WAITING,
+                 queue_timeout: float = PASSWORD_HASH_QUEUE_TIMEOUT):
+        self.workers = workers
+        self.max_waiting = max_waiting
+        self.queue_timeout = queue_timeout
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.waiting = 0
+        # Metrics
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+            self._slots = asyncio.Semaphore(self.workers)
+        return self._executor
+
+    async def _run(self, fn, *args):
+        executor = self._pool()
+        if self.waiting >= self.max_waiting:
+            self.rejected += 1
+            raise PasswordPoolBusy("Too many pending password checks")
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise PasswordPoolBusy("Timed out waiting for a password hashing worker")
+        finally:
+            self.waiting -= 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+        finally:
+            self._slots.release()
+            self.completed += 1
+
+    async def verify(self, stored_password: str, provided_password: str) -> bool:
+        return await self._run(check_password_hash, stored_password, provided_password)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(generate_password_hash, password)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._slots = None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "workers": self.workers,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+
+password_hasher = PasswordHasher()
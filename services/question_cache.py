@@ -0,0 +1,123 @@
+# services/question_cache.py
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, Iterable, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Question edits bump the advisor's version in this process only; a tree
+# cached by another worker is refreshed when it is this old
+DEFAULT_TREE_TTL = 300  # seconds
+
+
+@dataclass(frozen=True)
+class CachedQuestion:
+    """Detached, read-only copy of a DecisionTreeQuestion row."""
+    id: int
+    advisor_id: int
+    question: str
+    triggerKeyword: Optional[str]
+    step: int
+    next_step: Optional[int]
+    is_predefined_answer: bool
+
+    @classmethod
+    def from_row(cls, row) -> "CachedQuestion":
+        return cls(
+            id=row.id,
+            advisor_id=row.advisor_id,
+            question=row.question,
+            triggerKeyword=row.triggerKeyword,
+            step=row.step,
+            next_step=row.next_step,
+            is_predefined_answer=bool(row.is_predefined_answer),
+        )
+
+
+@dataclass(frozen=True)
+class QuestionTree:
+    """Compiled step -> question mapping for one advisor."""
+    advisor_id: int
+    version: Tuple[int, int]
+    steps: Mapping[int, CachedQuestion]
+    loaded_at: float
+
+    def get(self, step: int) -> Optional[CachedQuestion]:
+        return self.steps.get(step)
+
+
+class QuestionTreeCache:
+    """
+    Per-advisor cache of compiled decision trees.
+
+    Readers call get(); on a miss they load the advisor's rows themselves and
+    hand them to put() together with the version they read before loading, so
+    a tree loaded concurrently with an invalidation is never installed.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_TREE_TTL):
+        self.ttl = ttl
+        self._trees: Dict[int, QuestionTree] = {}
+        self._versions: Dict[int, int] = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def version(self, advisor_id: int) -> Tuple[int, int]:
+        return self._epoch, self._versions.get(advisor_id, 0)
+
+    def get(self, advisor_id: int) -> Optional[QuestionTree]:
+        tree = self._trees.get(advisor_id)
+        if tree is not None and (self.ttl is None or time.monotonic() - tree.loaded_at < self.ttl):
+            self.hits += 1
+            return tree
+        self.misses += 1
+        return None
+
+    def put(self, advisor_id: int, rows: Iterable, version: Tuple[int, int]) -> QuestionTree:
+        steps = {}
+        for row in rows:
+            question = CachedQuestion.from_row(row)
+            # Keep the first row per step, matching the original .first() lookup
+            steps.setdefault(question.step, question)
+        tree = QuestionTree(
+            advisor_id=advisor_id,
+            version=version,
+            steps=MappingProxyType(steps),
+            loaded_at=time.monotonic(),
+        )
+        with self._lock:
+            if self.version(advisor_id) == version:
+                self._trees[advisor_id] = tree
+            else:
+                logger.debug("Discarding stale question tree for advisor_id: %s", advisor_id)
+        return tree
+
+    def invalidate(self, advisor_id: Optional[int] = None):
+        """Drop the cached tree for one advisor, or for all advisors."""
+        with self._lock:
+            if advisor_id is None:
+                self._epoch += 1
+                self._trees.clear()
+            else:
+                self._versions[advisor_id] = self._versions.get(advisor_id, 0) + 1
+                self._trees.pop(advisor_id, None)
+        logger.info(
+            "Invalidated question tree cache for advisor_id: %s", advisor_id if advisor_id is not None else "all"
+        )
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "advisors": len(self._trees),
+        }
+
+
+question_cache = QuestionTreeCache()
@@ -1,12 +1,22 @@
 import logging
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from models.database import DecisionTreeQuestion
+from sqlalchemy import func, update, case, insert, delete, select, exists
+from sqlalchemy.exc import IntegrityError
+from typing import Iterator, List, Tuple
+import json
+from models.database import DecisionTreeQuestion, FinancialAdvisor, UserReply, SessionLocal
+from services.question_cache import question_cache
+from services.user_service import reply_cache
 
 logger = logging.getLogger(__name__)
 
+def _invalidate_advisor(advisor_id: int):
+    """Drop cached trees and replies that embed this advisor's questions."""
+    question_cache.invalidate(advisor_id)
+    reply_cache.invalidate_where(lambda key: key[0] == advisor_id)
+
 def add_question(db: Session, advisor_id: int, question: str, triggerKeyword: str, is_predefined_answer: bool):
-    logger.info(f"Adding question for advisor_id: {advisor_id}")
+    logger.info("Adding question for advisor_id: %s", advisor_id)
     max_step = db.query(func.max(DecisionTreeQuestion.step)).filter_by(advisor_id=advisor_id).scalar() or 0
     new_question = DecisionTreeQuestion(
         advisor_id=advisor_id,
@@ -18,38 +28,191 @@ def add_question(db: Session, advisor_id: int, question: str, triggerKeyword: st
     )
     db.add(new_question)
     db.commit()
-    logger.info(f"Question added with ID: {new_question.id}")
+    _invalidate_advisor(advisor_id)
+    logger.info("Question added with ID: %s", new_question.id)
     return new_question
 
 def get_questions(db: Session, advisor_id: int):
-    logger.debug(f"Fetching questions for advisor_id: {advisor_id}")
-    questions = db.query(DecisionTreeQuestion).filter_by(advisor_id=advisor_id).all()
-    logger.info(f"Retrieved {len(questions)} questions for advisor_id: {advisor_id}")
+    logger.debug("Fetching questions for advisor_id: %s", advisor_id)
+    questions = db.query(DecisionTreeQuestion).filter_by(advisor_id=advisor_id).order_by(
+        DecisionTreeQuestion.step, DecisionTreeQuestion.id
+    ).all()
+    logger.info("Retrieved %s questions for advisor_id: %s", len(questions), advisor_id)
     return questions
 
 def update_question(db: Session, question_id: int, step: int, question: str):
-    logger.info(f"Updating question ID: {question_id}")
+    logger.info("Updating question ID: %s", question_id)
     q = db.query(DecisionTreeQuestion).filter_by(id=question_id).first()
     if q:
         q.step = step
         q.question = question
         db.commit()
-        logger.info(f"Question ID: {question_id} updated successfully")
+        _invalidate_advisor(q.advisor_id)
+        logger.info("Question ID: %s updated successfully", question_id)
         return True
-    logger.warning(f"Question ID: {question_id} not found")
+    logger.warning("Question ID: %s not found", question_id)
     return False
 
+def compact_steps(db: Session, advisor_id: int, removed_step: int) -> int:
+    """
+    Close the gap left by a removed step with one set-based UPDATE over the
+    advisor's later questions. Primary keys are left untouched.
+    """
+    result = db.execute(
+        update(DecisionTreeQuestion)
+        .where(DecisionTreeQuestion.advisor_id == advisor_id, DecisionTreeQuestion.step > removed_step)
+        .values(
+            step=DecisionTreeQuestion.step - 1,
+            next_step=DecisionTreeQuestion.next_step - 1,
+        )
+    )
+    return result.rowcount
+
 def delete_question(db: Session, question_id: int):
-    logger.info(f"Deleting question ID: {question_id}")
+    logger.info("Deleting question ID: %s", question_id)
     question = db.query(DecisionTreeQuestion).filter_by(id=question_id).first()
     if question:
+        advisor_id, step = question.advisor_id, question.step
         db.delete(question)
+        db.flush()
+        shifted = compact_steps(db, advisor_id, step)
         db.commit()
-        remaining_questions = db.query(DecisionTreeQuestion).order_by(DecisionTreeQuestion.id).all()
-        for idx, q in enumerate(remaining_questions, 1):
-            q.id = idx
-        db.commit()
-        logger.info(f"Question ID: {question_id} deleted and IDs reordered")
+        _invalidate_advisor(advisor_id)
+        logger.info(
+            "Question ID: %s deleted, %s later steps moved up for advisor_id: %s", question_id, shifted, advisor_id
+        )
         return True
-    logger.warning(f"Question ID: {question_id} not found for deletion")
-    return False
\ No newline at end of file
+    logger.warning("Question ID: %s not found for deletion", question_id)
+    return False
+
+def reorder_questions(db: Session, advisor_id: int, question_ids: List[int]):
+    """
+    Apply a complete new ordering of an advisor's questions atomically:
+    question_ids[0] becomes step 1, and so on. The list must contain every
+    question of the advisor exactly once; otherwise ValueError is raised
+    and nothing changes.
+    """
+    logger.info("Reordering %s questions for advisor_id: %s", len(question_ids), advisor_id)
+    # Lock the advisor's rows so a concurrent add cannot slip in unordered
+    current_ids = {
+        row.id for row in db.query(DecisionTreeQuestion.id)
+        .filter_by(advisor_id=advisor_id)
+        .with_for_update()
+    }
+    if len(question_ids) != len(set(question_ids)) or set(question_ids) != current_ids:
+        db.rollback()
+        raise ValueError("question_ids must list each of the advisor's questions exactly once")
+    if not question_ids:
+        db.rollback()
+        return
+
+    new_steps = {question_id: step for step, question_id in enumerate(question_ids, 1)}
+    db.execute(
+        update(DecisionTreeQuestion)
+        .where(DecisionTreeQuestion.advisor_id == advisor_id, DecisionTreeQuestion.id.in_(question_ids))
+        .values(
+            step=case(new_steps, value=DecisionTreeQuestion.id),
+            next_step=case(new_steps, value=DecisionTreeQuestion.id) + 1,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    _invalidate_advisor(advisor_id)
+    logger.info("Reordered questions for advisor_id: %s", advisor_id)
+
+def import_question_tree(db: Session, advisor_id: int, questions: List[dict], replace: bool = False) -> Tuple[int, int, int]:
+    """
+    Write a whole decision tree with one bulk INSERT in one transaction.
+
+    Steps in the document are relative to the tree (default: list position)
+    and are appended after the advisor's current last step, or start at 1
+    when replace is set. Returns (imported, first_step, last_step).
+    """
+    logger.info("Importing %s questions for advisor_id: %s (replace=%s)", len(questions), advisor_id, replace)
+    relative_steps = [q.get("step") or idx for idx, q in enumerate(questions, 1)]
+    if len(set(relative_steps)) != len(relative_steps):
+        raise ValueError("Each question in the tree must have a distinct step")
+
+    if db.get(FinancialAdvisor, advisor_id) is None:
+        raise ValueError(f"Advisor {advisor_id} does not exist")
+
+    try:
+        if replace:
+            has_replies = db.execute(
+                select(exists().where(
+                    UserReply.question_id == DecisionTreeQuestion.id,
+                    DecisionTreeQuestion.advisor_id == advisor_id,
+                ))
+            ).scalar()
+            if has_replies:
+                db.rollback()
+                raise ValueError("Existing questions have recorded replies and cannot be replaced")
+            db.execute(delete(DecisionTreeQuestion).where(DecisionTreeQuestion.advisor_id == advisor_id))
+            offset = 0
+        else:
+            offset = db.execute(
+                select(func.max(DecisionTreeQuestion.step))
+                .where(DecisionTreeQuestion.advisor_id == advisor_id)
+                .with_for_update()
+            ).scalar() or 0
+
+        rows = [
+            {
+                "advisor_id": advisor_id,
+                "question": q["question"],
+                "triggerKeyword": q["triggerKeyword"],
+                "is_predefined_answer": bool(q.get("is_predefined_answer")),
+                "step": offset + step,
+                "next_step": offset + (q.get("next_step") or step + 1),
+            }
+            for q, step in zip(questions, relative_steps)
+        ]
+        db.execute(insert(DecisionTreeQuestion), rows)
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        logger.error("Question tree import rejected for advisor_id %s: %s", advisor_id, e)
+        raise ValueError("Question tree import violates a database constraint") from e
+
+    _invalidate_advisor(advisor_id)
+    first_step, last_step = offset + min(relative_steps), offset + max(relative_steps)
+    logger.info("Imported %s questions for advisor_id: %s, steps %s-%s", len(rows), advisor_id, first_step, last_step)
+    return len(rows), first_step, last_step
+
+def iter_question_tree_json(advisor_id: int, batch_size: int = 500) -> Iterator[str]:
+    """
+    Stream an advisor's tree as one JSON document in the import format.
+    Opens its own session because the response body outlives the request.
+    """
+    logger.info("Exporting question tree for advisor_id: %s", advisor_id)
+    stmt = (
+        select(
+            DecisionTreeQuestion.step,
+            DecisionTreeQuestion.next_step,
+            DecisionTreeQuestion.question,
+            DecisionTreeQuestion.triggerKeyword,
+            DecisionTreeQuestion.is_predefined_answer,
+        )
+        .where(DecisionTreeQuestion.advisor_id == advisor_id)
+        .order_by(DecisionTreeQuestion.step, DecisionTreeQuestion.id)
+        .execution_options(yield_per=batch_size)
+    )
+    db = SessionLocal()
+    try:
+        yield f'{{"advisor_id": {json.dumps(advisor_id)}, "questions": ['
+        separator = ""
+        for partition in db.execute(stmt).partitions():
+            chunk = []
+            for row in partition:
+                chunk.append(separator + json.dumps({
+                    "question": row.question,
+                    "triggerKeyword": row.triggerKeyword,
+                    "is_predefined_answer": bool(row.is_predefined_answer),
+                    "step": row.step,
+                    "next_step": row.next_step,
+                }))
+                separator = ", "
+            yield "".join(chunk)
+        yield "]}"
+    finally:
+        db.close()
@@ -0,0 +1,110 @@
+# services/rate_limiter.py
+import asyncio
+import threading
+import time
+from typing import Dict, Hashable, Optional, Tuple
+
+
+class RateLimiter:
+    """
+    Token-bucket limiter implemented as GCRA (generic cell rate algorithm).
+
+    The whole bucket state is one timestamp, the theoretical arrival time
+    (TAT), so acquire and try_acquire are O(1). acquire() reserves the next
+    free slot under a short lock and then sleeps outside it; slots are handed
+    out in call order, which makes waiting FIFO.
+    """
+
+    def __init__(self, max_requests: int, window: float, burst: Optional[int] = None):
+        if max_requests < 1 or window <= 0:
+            raise ValueError("max_requests must be >= 1 and window must be > 0")
+        self.max_requests = max_requests
+        self.window = window
+        self.burst = burst if burst is not None else max_requests
+        self.emission_interval = window / max_requests
+        # How far ahead of the steady rate the bucket may run, i.e. burst - 1 slots
+        self.tolerance = self.emission_interval * (max(self.burst, 1) - 1)
+        self._tat = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self, now: float) -> Tuple[float, float]:
+        """Reserve the next slot; returns (delay before it may be used, new TAT)."""
+        with self._lock:
+            tat = max(self._tat, now)
+            self._tat = tat + self.emission_interval
+            return tat - self.tolerance - now, self._tat
+
+    def _release(self, reserved_tat: float):
+        # Give back a slot abandoned by a cancelled waiter if nobody queued after it
+        with self._lock:
+            if self._tat == reserved_tat:
+                self._tat -= self.emission_interval
+
+    def try_acquire(self) -> bool:
+        """Take a slot if one is free right now; never waits."""
+        now = time.monotonic()
+        with self._lock:
+            tat = max(self._tat, now)
+            if tat - self.tolerance > now:
+                return False
+            self._tat = tat + self.emission_interval
+            return True
+
+    async def acquire(self) -> float:
+        """Wait for a slot; returns the time spent waiting in seconds."""
+        now = time.monotonic()
+        delay, reserved_tat = self._reserve(now)
+        if delay <= 0:
+            return 0.0
+        loop = asyncio.get_running_loop()
+        # Sleep until the absolute slot time rather than for a relative delay,
+        # so a stall between reserving and sleeping cannot reorder waiters
+        deadline = now + delay + (loop.time() - time.monotonic())
+        waiter = loop.create_future()
+        handle = loop.call_at(deadline, _wake, waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            self._release(reserved_tat)
+            raise
+        finally:
+            handle.cancel()
+        return delay
+
+
+def _wake(waiter: asyncio.Future):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class KeyedRateLimiter:
+    """
+    Independent RateLimiter per key, e.g. per sender number or messaging
+    service SID. Keys without an explicit limit use the default one.
+    """
+
+    def __init__(self, max_requests: int, window: float, burst: Optional[int] = None):
+        self.max_requests = max_requests
+        self.window = window
+        self.burst = burst
+        self._limiters: Dict[Hashable, RateLimiter] = {}
+        self._lock = threading.Lock()
+
+    def set_limit(self, key: Hashable, max_requests: int, window: float, burst: Optional[int] = None):
+        with self._lock:
+            self._limiters[key] = RateLimiter(max_requests, window, burst)
+
+    def limiter(self, key: Hashable) -> RateLimiter:
+        limiter = self._limiters.get(key)
+        if limiter is None:
+            with self._lock:
+                limiter = self._limiters.get(key)
+                if limiter is None:
+                    limiter = self._limiters[key] = RateLimiter(self.max_requests, self.window, self.burst)
+        return limiter
+
+    def try_acquire(self, key: Hashable = None) -> bool:
+        return self.limiter(key).try_acquire()
+
+    async def acquire(self, key: Hashable = None) -> float:
+        return await self.limiter(key).acquire()
@@ -0,0 +1,211 @@
+# services/recaptcha_verifier.py
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+import aiohttp
+
+from services.config_store import Settings, config_store
+from services.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """
+    Classic closed / open / half-open breaker.
+
+    After failure_threshold consecutive failures the circuit opens and calls
+    are refused for reset_timeout seconds; then a single trial call is let
+    through, and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_in_flight or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    self.times_opened += 1
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+class RecaptchaVerifier:
+    """
+    Async reCAPTCHA siteverify client on a shared keep-alive pool.
+
+    Verdicts are cached per token and submission for a short TTL so an
+    identical retried submission is not re-verified (Google rejects a
+    token's second use). When the verifier errors or times out repeatedly
+    the circuit breaker opens, and verify() answers with the configured
+    policy: fail_open=True accepts submissions, fail_open=False rejects
+    them, without waiting on the network.
+    """
+
+    def __init__(
+        self,
+        secret_key: Optional[str],
+        url: Optional[str],
+        timeout: float = 3.0,
+        max_connections: int = 20,
+        cache_size: int = 4096,
+        cache_ttl: float = 120.0,
+        fail_open: bool = False,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.secret_key = secret_key
+        self.url = url
+        self.max_connections = max_connections
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.fail_open = fail_open
+        self.breaker = breaker or CircuitBreaker()
+        self.verdicts = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_lock = asyncio.Lock()
+        # Metrics
+        self.verified = 0
+        self.failures = 0
+        self.short_circuited = 0
+
+    @classmethod
+    def from_env(cls) -> "RecaptchaVerifier":
+        settings = config_store.current
+        return cls(
+            secret_key=settings.captcha_secret_key,
+            url=settings.captcha_url,
+            timeout=float(os.getenv("CAPTCHA_TIMEOUT", 3)),
+            max_connections=int(os.getenv("CAPTCHA_MAX_CONNECTIONS", 20)),
+            cache_ttl=float(os.getenv("CAPTCHA_CACHE_TTL", 120)),
+            fail_open=os.getenv("CAPTCHA_FAIL_OPEN", "false").lower() in ("1", "true", "yes"),
+            breaker=CircuitBreaker(
+                failure_threshold=int(os.getenv("CAPTCHA_BREAKER_FAILURES", 5)),
+                reset_timeout=float(os.getenv("CAPTCHA_BREAKER_RESET", 30)),
+            ),
+        )
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            async with self._session_lock:
+                if self._session is None or self._session.closed:
+                    self._session = aiohttp.ClientSession(
+                        connector=aiohttp.TCPConnector(limit=self.max_connections),
+                        timeout=self.timeout,
+                    )
+        return self._session
+
+    def set_endpoint(self, secret_key: Optional[str], url: Optional[str]):
+        self.secret_key, self.url = secret_key, url
+        self.verdicts.clear()
+
+    async def verify(self, token: str, context: str = "") -> bool:
+        """
+        Verify a token. context identifies what the token is submitted with
+        (e.g. a digest of the form); a cached verdict is only reused for the
+        same token and context, so a solved captcha cannot vouch for other
+        submissions.
+        """
+        secret_key, url = self.secret_key, self.url
+        if not secret_key or not url:
+            logger.error("reCAPTCHA configuration missing: secret_key or url not set")
+            return False
+
+        key = hashlib.sha256(token.encode() + b"\0" + context.encode()).digest()
+        verdict = self.verdicts.get(key)
+        if verdict is not None:
+            return verdict
+
+        if not self.breaker.allow():
+            self.short_circuited += 1
+            logger.warning("reCAPTCHA circuit open; failing %s", "open" if self.fail_open else "closed")
+            return self.fail_open
+
+        # Every admitted call must report back, or a half-open trial that is
+        # cancelled would leave the breaker open for good
+        succeeded = False
+        try:
+            session = await self._get_session()
+            async with session.post(url, data={"secret": secret_key, "response": token}) as response:
+                response.raise_for_status()
+                result = await response.json(content_type=None)
+            succeeded = isinstance(result, dict)
+            if not succeeded:
+                raise ValueError(f"unexpected siteverify response: {result!r}")
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            self.failures += 1
+            logger.error("reCAPTCHA verification failed due to network error: %r", e)
+            return self.fail_open
+        finally:
+            if succeeded:
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+
+        self.verified += 1
+        verdict = bool(result.get("success", False))
+        self.verdicts.set(key, verdict)
+        logger.info("reCAPTCHA verification result: %s", verdict)
+        return verdict
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "verified": self.verified,
+            "failures": self.failures,
+            "short_circuited": self.short_circuited,
+            "breaker_state": self.breaker.state,
+            "breaker_opened": self.breaker.times_opened,
+            "cache": self.verdicts.stats(),
+        }
+
+
+recaptcha_verifier = RecaptchaVerifier.from_env()
+
+
+def _apply_endpoint(old: Settings, new: Settings):
+    if (old.captcha_secret_key, old.captcha_url) != (new.captcha_secret_key, new.captcha_url):
+        recaptcha_verifier.set_endpoint(new.captcha_secret_key, new.captcha_url)
+        logger.info("reCAPTCHA settings changed; applied to the verifier")
+
+
+config_store.subscribe(_apply_endpoint)
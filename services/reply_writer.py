@@ -0,0 +1,216 @@
+# services/reply_writer.py
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Deque, Dict, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError
+
+from models.database import AsyncSessionLocal, UserReply
+from services.user_service import reply_cache
+
+logger = logging.getLogger(__name__)
+
+REPLY_WRITE_BEHIND = os.getenv("REPLY_WRITE_BEHIND", "false").lower() in ("1", "true", "yes")
+REPLY_FLUSH_ROWS = int(os.getenv("REPLY_FLUSH_ROWS", 200))
+REPLY_FLUSH_MS = int(os.getenv("REPLY_FLUSH_MS", 200))
+REPLY_BUFFER_CAPACITY = int(os.getenv("REPLY_BUFFER_CAPACITY", 10000))
+REPLY_FLUSH_ATTEMPTS = int(os.getenv("REPLY_FLUSH_ATTEMPTS", 3))  # failed bulk inserts before going row by row
+REPLY_DEAD_LETTER_SIZE = 1000  # rejected rows kept in memory for inspection
+
+
+class ReplyWriteBuffer:
+    """
+    Optional write-behind buffer for UserReply rows.
+
+    Replies are queued in arrival order and written by a single flusher with
+    one bulk INSERT every max_batch rows or flush_interval seconds, whichever
+    comes first. One FIFO queue and one flusher keep each user's replies in
+    insert order, and created_at is stamped at submit time, so ordering by
+    created_at also holds for replies that fell back to a synchronous
+    commit while earlier ones were still buffered. submit() returns False
+    when the buffer is disabled, stopped or full; callers then commit the
+    reply synchronously. Rows from a failed flush are put back at the head
+    of the queue and retried. After max_attempts failures in a row the
+    batch is inserted row by row: rows the database rejects (integrity or
+    data errors, e.g. a deleted question or an over-long reply) are logged
+    and moved to dead_letters, so one bad row cannot block the queue.
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal, enabled: bool = REPLY_WRITE_BEHIND,
+                 max_batch: int = REPLY_FLUSH_ROWS, flush_interval: float = REPLY_FLUSH_MS / 1000,
+                 capacity: int = REPLY_BUFFER_CAPACITY, max_attempts: int = REPLY_FLUSH_ATTEMPTS):
+        self.session_factory = session_factory
+        self.enabled = enabled
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.capacity = capacity
+        self.max_attempts = max_attempts
+        self.dead_letters: Deque[dict] = deque(maxlen=REPLY_DEAD_LETTER_SIZE)
+        self._failed_attempts = 0
+        self._pending: Deque[Tuple[dict, Tuple[int, int]]] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        # Metrics
+        self.flushes = 0
+        self.flush_failures = 0
+        self.rows_written = 0
+        self.rejected = 0
+        self.dead_lettered = 0
+        self.last_batch_size = 0
+        self.max_batch_size = 0
+        self.last_flush_latency = 0.0
+        self.max_flush_latency = 0.0
+        self.total_flush_latency = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        if not self.enabled:
+            return
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = asyncio.create_task(self._run())
+        logger.info(
+            "Reply write-behind enabled: flush every %s rows or %.0f ms, capacity %s",
+            self.max_batch, self.flush_interval * 1000, self.capacity
+        )
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        # Drain whatever is left before the process exits. A failing batch is
+        # retried up to max_attempts times and then written row by row, so
+        # only rows the database keeps refusing are lost.
+        while self._pending:
+            if await self.flush():
+                continue
+            if self._failed_attempts >= self.max_attempts:
+                logger.error("Dropping %s buffered replies at shutdown", len(self._pending))
+                break
+            await asyncio.sleep(self.flush_interval)
+        logger.info("Reply write-behind stopped")
+
+    def submit(self, user_id: int, question_id: int, reply: str, advisor_id: int) -> bool:
+        """Queue a reply for the next bulk insert; False means write it synchronously."""
+        if not self.running or len(self._pending) >= self.capacity:
+            if self.running:
+                self.rejected += 1
+            return False
+        row = {
+            "user_id": user_id,
+            "question_id": question_id,
+            "reply": reply,
+            "created_at": datetime.now(timezone.utc),
+        }
+        self._pending.append((row, (advisor_id, user_id)))
+        if len(self._pending) >= self.max_batch:
+            self._wakeup.set()
+        return True
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            while self._pending:
+                if not await self.flush() or len(self._pending) < self.max_batch:
+                    break
+
+    async def flush(self) -> bool:
+        """Write up to max_batch queued replies in one INSERT; returns False on failure."""
+        async with self._flush_lock:
+            if not self._pending:
+                return True
+            batch = [self._pending.popleft() for _ in range(min(self.max_batch, len(self._pending)))]
+            start = time.perf_counter()
+            try:
+                async with self.session_factory() as db:
+                    await db.execute(insert(UserReply), [row for row, _ in batch])
+                    await db.commit()
+            except Exception as e:
+                self.flush_failures += 1
+                self._failed_attempts += 1
+                logger.error("Failed to flush %s buffered replies: %s", len(batch), e)
+                if self._failed_attempts < self.max_attempts:
+                    self._pending.extendleft(reversed(batch))
+                    return False
+                batch = await self._insert_rows(batch)
+                if batch is None:
+                    return False
+
+            self._failed_attempts = 0
+            latency = time.perf_counter() - start
+            self.flushes += 1
+            self.rows_written += len(batch)
+            self.last_batch_size = len(batch)
+            self.max_batch_size = max(self.max_batch_size, len(batch))
+            self.last_flush_latency = latency
+            self.max_flush_latency = max(self.max_flush_latency, latency)
+            self.total_flush_latency += latency
+            for cache_key in {cache_key for _, cache_key in batch}:
+                reply_cache.invalidate(cache_key)
+            logger.debug("Flushed %s replies in %.1f ms", len(batch), latency * 1000)
+            return True
+
+    async def _insert_rows(self, batch):
+        """
+        Insert a repeatedly failing batch one row at a time. Returns the rows
+        that were written, or None when a row failed for a reason other than
+        the row itself (e.g. the database is down); the unwritten rows are
+        then put back at the head of the queue.
+        """
+        written = []
+        for position, (row, cache_key) in enumerate(batch):
+            try:
+                async with self.session_factory() as db:
+                    await db.execute(insert(UserReply), [row])
+                    await db.commit()
+            except (IntegrityError, DataError) as e:
+                self.dead_lettered += 1
+                self.dead_letters.append(row)
+                logger.error(
+                    "Dead-lettered reply for user_id: %s, question_id: %s: %s",
+                    row["user_id"], row["question_id"], e
+                )
+                continue
+            except Exception as e:
+                logger.error("Row-by-row reply flush failed: %s", e)
+                self._pending.extendleft(reversed(batch[position:]))
+                self.rows_written += len(written)
+                for key in {key for _, key in written}:
+                    reply_cache.invalidate(key)
+                return None
+            written.append((row, cache_key))
+        return written
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "pending": len(self._pending),
+            "flushes": self.flushes,
+            "flush_failures": self.flush_failures,
+            "rows_written": self.rows_written,
+            "rejected": self.rejected,
+            "dead_lettered": self.dead_lettered,
+            "last_batch_size": self.last_batch_size,
+            "max_batch_size": self.max_batch_size,
+            "avg_batch_size": self.rows_written / self.flushes if self.flushes else 0.0,
+            "last_flush_latency_ms": self.last_flush_latency * 1000,
+            "max_flush_latency_ms": self.max_flush_latency * 1000,
+            "avg_flush_latency_ms": self.total_flush_latency / self.flushes * 1000 if self.flushes else 0.0,
+        }
+
+
+reply_writer = ReplyWriteBuffer()
@@ -0,0 +1,76 @@
+# services/revocation_store.py
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+from services.session_store import MemorySessionStore, SQLiteSessionStore, SessionStore
+
+logger = logging.getLogger(__name__)
+
+PURGE_INTERVAL = 60  # seconds between opportunistic sweeps of expired entries
+
+
+class RevocationStore:
+    """
+    Revoked token ids (jti, or a digest for tokens without one), each kept
+    only until the token's own exp. Any SessionStore backend works: lookups
+    are a dict hit in memory or a primary-key lookup in SQLite, and the
+    SQLite backend makes a logout visible to every worker on the host.
+    """
+
+    def __init__(self, store: SessionStore, purge_interval: float = PURGE_INTERVAL):
+        self.store = store
+        self.purge_interval = purge_interval
+        self._next_purge = 0.0
+        self._purge_lock = threading.Lock()
+        self.purged_count = 0
+
+    def revoke(self, token_id: str, expires_at: float):
+        now = time.time()
+        if expires_at > now:
+            self.store.set(token_id, True, expires_at)
+        self._maybe_purge(now)
+
+    def is_revoked(self, token_id: str) -> bool:
+        now = time.time()
+        self._maybe_purge(now)
+        return self.store.get(token_id, now) is not None
+
+    def purge(self, now: Optional[float] = None) -> int:
+        removed = self.store.purge_expired(time.time() if now is None else now)
+        self.purged_count += removed
+        return removed
+
+    def _maybe_purge(self, now: float):
+        if now < self._next_purge or not self._purge_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_purge = now + self.purge_interval
+            removed = self.purge(now)
+            if removed:
+                logger.debug("Pruned %s expired token revocations", removed)
+        finally:
+            self._purge_lock.release()
+
+    def __len__(self):
+        return len(self.store)
+
+
+def create_revocation_store(backend=None) -> RevocationStore:
+    """
+    Build the store selected by REVOCATION_BACKEND ("memory" or "sqlite"),
+    defaulting to SESSION_BACKEND. The SQLite backend shares the session
+    database file in its own revoked_tokens table.
+    """
+    backend = (backend or os.getenv("REVOCATION_BACKEND") or os.getenv("SESSION_BACKEND", "memory")).lower()
+    if backend == "memory":
+        return RevocationStore(MemorySessionStore())
+    if backend == "sqlite":
+        path = os.getenv("REVOCATION_DB_PATH") or os.getenv("SESSION_DB_PATH", "sessions.db")
+        return RevocationStore(SQLiteSessionStore(path, table="revoked_tokens"))
+    raise ValueError(f"Unknown REVOCATION_BACKEND: {backend}")
+
+
+revocation_store = create_revocation_store()
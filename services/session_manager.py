@@ -1,35 +1,70 @@
 # services/session_manager.py
 import time
 import threading
+from services.session_store import create_session_store
+
+# Bounds for the expiry thread's sleep between ticks
+MIN_CLEANUP_INTERVAL = 1  # seconds
+MAX_CLEANUP_INTERVAL = 60  # seconds, also picks up deadlines set by other workers
+CLEANUP_BATCH_SIZE = 1000  # entries removed per lock acquisition
+# Sessions with a TTL override are stored as {TTL_KEY: ttl, "value": session}
+TTL_KEY = "__session_ttl__"
 
 class SessionManager:
-    def __init__(self, expiration_time=86400):
-        self.sessions = {}
+    def __init__(self, expiration_time=86400, store=None):
+        self.store = store if store is not None else create_session_store()
         self.expiration_time = expiration_time
-        self.lock = threading.Lock()
+        self.expired_count = 0
+        self._wakeup = threading.Condition()
+        self._next_wakeup = float("inf")
         self.cleanup_thread = threading.Thread(target=self.cleanup_sessions, daemon=True)
         self.cleanup_thread.start()
 
-    def set_session(self, key, value):
-        with self.lock:
-            self.sessions[key] = (value, time.time())
+    def set_session(self, key, value, ttl=None):
+        """
+        Store a session. ttl overrides expiration_time for this entry and is
+        kept by later set_session calls for the same key that omit it.
+        """
+        if ttl is None:
+            ttl = self._ttl_override(key)
+        if ttl is None:
+            expires_at = time.time() + self.expiration_time
+        else:
+            expires_at = time.time() + ttl
+            value = {TTL_KEY: ttl, "value": value}
+        self.store.set(key, value, expires_at)
+        if expires_at < self._next_wakeup:
+            with self._wakeup:
+                self._wakeup.notify()
 
     def get_session(self, key):
-        with self.lock:
-            session = self.sessions.get(key)
-            if session and time.time() - session[1] < self.expiration_time:
-                return session[0]
-            elif session:
-                del self.sessions[key]
-        return None
+        entry = self.store.get(key, time.time())
+        if isinstance(entry, dict) and TTL_KEY in entry:
+            return entry["value"]
+        return entry
+
+    def _ttl_override(self, key):
+        entry = self.store.get(key, time.time())
+        return entry.get(TTL_KEY) if isinstance(entry, dict) else None
+
+    def clear_session(self, key):
+        self.store.delete(key)
 
     def cleanup_sessions(self):
+        """Expire sessions as their deadlines come due, one small batch at a time."""
         while True:
-            time.sleep(3600)  # Run cleanup every hour
-            with self.lock:
-                current_time = time.time()
-                keys_to_delete = [key for key, (_, timestamp) in self.sessions.items() if current_time - timestamp >= self.expiration_time]
-                for key in keys_to_delete:
-                    del self.sessions[key]
-
-session_manager = SessionManager()
\ No newline at end of file
+            now = time.time()
+            while True:
+                removed = self.store.purge_expired(now, limit=CLEANUP_BATCH_SIZE)
+                self.expired_count += removed
+                if removed < CLEANUP_BATCH_SIZE:
+                    break
+
+            next_expiry = self.store.next_expiry()
+            delay = MAX_CLEANUP_INTERVAL if next_expiry is None else next_expiry - time.time()
+            delay = min(max(delay, MIN_CLEANUP_INTERVAL), MAX_CLEANUP_INTERVAL)
+            with self._wakeup:
+                self._next_wakeup = time.time() + delay
+                self._wakeup.wait(delay)
+
+session_manager = SessionManager()
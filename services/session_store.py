@@ -0,0 +1,231 @@
+# services/session_store.py
+import heapq
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import zlib
+
+logger = logging.getLogger(__name__)
+
+
+class SessionStore:
+    """
+    Storage backend used by SessionManager.
+
+    Entries carry an absolute expiry timestamp; get() never returns an entry
+    whose expiry has passed.
+    """
+
+    def get(self, key, now):
+        raise NotImplementedError
+
+    def set(self, key, value, expires_at):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def purge_expired(self, now, limit=None):
+        """Remove up to limit expired entries and return how many were removed."""
+        raise NotImplementedError
+
+    def next_expiry(self):
+        """Earliest expiry timestamp held by the store, or None when empty."""
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
+
+
+class MemorySessionStore(SessionStore):
+    """
+    Process-local dict store. Only safe with a single uvicorn worker.
+
+    Expiry deadlines are kept in a min-heap next to the dict, so purging
+    pops only the entries that are actually due instead of scanning every
+    session. Overwritten or deleted entries leave stale heap items behind;
+    they are skipped when popped and the heap is rebuilt once they dominate.
+    """
+
+    def __init__(self):
+        self.sessions = {}
+        self.lock = threading.Lock()
+        self._heap = []
+        self._counter = itertools.count()
+
+    def get(self, key, now):
+        with self.lock:
+            session = self.sessions.get(key)
+            if session and now < session[1]:
+                return session[0]
+            elif session:
+                del self.sessions[key]
+        return None
+
+    def set(self, key, value, expires_at):
+        with self.lock:
+            self.sessions[key] = (value, expires_at)
+            heapq.heappush(self._heap, (expires_at, next(self._counter), key))
+            if len(self._heap) > 2 * len(self.sessions) + 1024:
+                self._compact()
+
+    def delete(self, key):
+        with self.lock:
+            self.sessions.pop(key, None)
+
+    def purge_expired(self, now, limit=None):
+        removed = 0
+        with self.lock:
+            heap = self._heap
+            while heap and heap[0][0] <= now and (limit is None or removed < limit):
+                expires_at, _, key = heapq.heappop(heap)
+                session = self.sessions.get(key)
+                # Only remove if the heap item still matches the live entry
+                if session is not None and session[1] == expires_at:
+                    del self.sessions[key]
+                    removed += 1
+        return removed
+
+    def next_expiry(self):
+        with self.lock:
+            return self._heap[0][0] if self._heap else None
+
+    def _compact(self):
+        self._heap = [(expires_at, next(self._counter), key) for key, (_, expires_at) in self.sessions.items()]
+        heapq.heapify(self._heap)
+
+    def __len__(self):
+        return len(self.sessions)
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    On-disk store shared by every worker process on the host.
+
+    Values are stored as JSON, so they must be JSON-serializable dicts, lists
+    or scalars. Each thread gets its own connection; WAL mode lets readers in
+    one worker proceed while another worker writes.
+    """
+
+    def __init__(self, path, table="sessions", busy_timeout=5.0):
+        self.path = path
+        self.table = table
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute(f"CREATE INDEX IF NOT EXISTS ix_{self.table}_expires_at ON {self.table} (expires_at)")
+        logger.info("Using SQLite session store at %s (table %s)", os.path.abspath(self.path), self.table)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key, now):
+        row = self._connection().execute(
+            f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        if now < row[1]:
+            return json.loads(row[0])
+        self._connection().execute(
+            f"DELETE FROM {self.table} WHERE key = ? AND expires_at <= ?", (key, now)
+        )
+        return None
+
+    def set(self, key, value, expires_at):
+        self._connection().execute(
+            f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value), expires_at),
+        )
+
+    def delete(self, key):
+        self._connection().execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def purge_expired(self, now, limit=None):
+        # The expires_at index keeps this to the rows that are actually due
+        if limit is None:
+            cursor = self._connection().execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (now,))
+        else:
+            cursor = self._connection().execute(
+                f"DELETE FROM {self.table} WHERE key IN "
+                f"(SELECT key FROM {self.table} WHERE expires_at <= ? ORDER BY expires_at LIMIT ?)",
+                (now, limit),
+            )
+        return cursor.rowcount
+
+    def next_expiry(self):
+        return self._connection().execute(f"SELECT MIN(expires_at) FROM {self.table}").fetchone()[0]
+
+    def __len__(self):
+        return self._connection().execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+
+class ShardedSessionStore(SessionStore):
+    """
+    Lock-striped store: keys are hashed onto independent shards, each with
+    its own lock and expiry heap, so lookups for different numbers do not
+    queue behind one another.
+    """
+
+    def __init__(self, shard_count=16, shard_factory=MemorySessionStore):
+        if shard_count < 1:
+            raise ValueError("shard_count must be at least 1")
+        self.shards = [shard_factory() for _ in range(shard_count)]
+
+    def _shard(self, key):
+        # crc32 is stable across processes, unlike the salted built-in hash()
+        return self.shards[zlib.crc32(str(key).encode()) % len(self.shards)]
+
+    def get(self, key, now):
+        return self._shard(key).get(key, now)
+
+    def set(self, key, value, expires_at):
+        self._shard(key).set(key, value, expires_at)
+
+    def delete(self, key):
+        self._shard(key).delete(key)
+
+    def purge_expired(self, now, limit=None):
+        removed = 0
+        for shard in self.shards:
+            removed += shard.purge_expired(now, None if limit is None else limit - removed)
+            if limit is not None and removed >= limit:
+                break
+        return removed
+
+    def next_expiry(self):
+        deadlines = [deadline for deadline in (shard.next_expiry() for shard in self.shards) if deadline is not None]
+        return min(deadlines) if deadlines else None
+
+    def __len__(self):
+        return sum(len(shard) for shard in self.shards)
+
+
+def create_session_store(backend=None, shards=None):
+    """
+    Build the store selected by SESSION_BACKEND ("memory" or "sqlite").
+    The memory backend is sharded when SESSION_SHARDS is greater than 1.
+    """
+    backend = (backend or os.getenv("SESSION_BACKEND", "memory")).lower()
+    shards = int(shards if shards is not None else os.getenv("SESSION_SHARDS", 1))
+    if backend == "memory":
+        if shards > 1:
+            return ShardedSessionStore(shards)
+        return MemorySessionStore()
+    if backend == "sqlite":
+        return SQLiteSessionStore(os.getenv("SESSION_DB_PATH", "sessions.db"))
+    raise ValueError(f"Unknown SESSION_BACKEND: {backend}")
@@ -0,0 +1,185 @@
+# services/twilio_transport.py
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import aiohttp
+
+from services.config_store import Settings, config_store
+from services.metrics import TWILIO_ERRORS, TWILIO_REQUEST_SECONDS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TWILIO_API_BASE_URL = "https://api.twilio.com"
+
+
+class TwilioTransportError(Exception):
+    """Raised when Twilio rejects a request or cannot be reached."""
+
+    def __init__(self, message: str, status: Optional[int] = None, code: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+
+
+@dataclass(frozen=True)
+class TwilioMessage:
+    sid: str
+    status: Optional[str] = None
+
+
+class TwilioTransport:
+    """
+    Async client for Twilio's Messages API on a shared keep-alive pool.
+
+    The aiohttp session is created lazily on first use so it binds to the
+    running event loop, and reused for every send after that. Credentials
+    are applied per request from one atomically swapped tuple, so
+    set_credentials() takes effect on the next send without tearing down
+    the connection pool.
+    """
+
+    def __init__(
+        self,
+        account_sid: Optional[str],
+        auth_token: Optional[str],
+        base_url: str = DEFAULT_TWILIO_API_BASE_URL,
+        max_connections: int = 100,
+        keepalive_timeout: float = 30.0,
+        connect_timeout: float = 5.0,
+        total_timeout: float = 15.0,
+    ):
+        self.set_credentials(account_sid, auth_token)
+        self.base_url = base_url.rstrip("/")
+        self.max_connections = max_connections
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = aiohttp.ClientTimeout(total=total_timeout, connect=connect_timeout)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_lock = asyncio.Lock()
+
+    @classmethod
+    def from_env(cls) -> "TwilioTransport":
+        settings = config_store.current
+        return cls(
+            account_sid=settings.twilio_account_sid,
+            auth_token=settings.twilio_auth_token,
+            base_url=os.getenv("TWILIO_API_BASE_URL", DEFAULT_TWILIO_API_BASE_URL),
+            max_connections=int(os.getenv("TWILIO_MAX_CONNECTIONS", 100)),
+            keepalive_timeout=float(os.getenv("TWILIO_KEEPALIVE_TIMEOUT", 30)),
+            connect_timeout=float(os.getenv("TWILIO_CONNECT_TIMEOUT", 5)),
+            total_timeout=float(os.getenv("TWILIO_TIMEOUT", 15)),
+        )
+
+    def set_credentials(self, account_sid: Optional[str], auth_token: Optional[str]):
+        self._credentials = (account_sid, auth_token, aiohttp.BasicAuth(account_sid or "", auth_token or ""))
+
+    @property
+    def account_sid(self) -> Optional[str]:
+        return self._credentials[0]
+
+    @property
+    def auth_token(self) -> Optional[str]:
+        return self._credentials[1]
+
+    @property
+    def messages_url(self) -> str:
+        return self._messages_url(self.account_sid)
+
+    def _messages_url(self, account_sid: Optional[str]) -> str:
+        return f"{self.base_url}/2010-04-01/Accounts/{account_sid}/Messages.json"
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            async with self._session_lock:
+                if self._session is None or self._session.closed:
+                    connector = aiohttp.TCPConnector(
+                        limit=self.max_connections,
+                        limit_per_host=self.max_connections,
+                        keepalive_timeout=self.keepalive_timeout,
+                    )
+                    self._session = aiohttp.ClientSession(
+                        connector=connector,
+                        timeout=self.timeout,
+                    )
+                    logger.info("Opened Twilio connection pool (max %s connections)", self.max_connections)
+        return self._session
+
+    async def send_message(
+        self,
+        to: str,
+        from_: Optional[str] = None,
+        body: Optional[str] = None,
+        content_sid: Optional[str] = None,
+        content_variables: Optional[str] = None,
+        messaging_service_sid: Optional[str] = None,
+    ) -> TwilioMessage:
+        """Create a message; mirrors the arguments of Client.messages.create."""
+        account_sid, auth_token, auth = self._credentials
+        if not account_sid or not auth_token:
+            raise TwilioTransportError("Twilio credentials are not configured")
+
+        form = {"To": to}
+        optional_fields = {
+            "From": from_,
+            "Body": body,
+            "ContentSid": content_sid,
+            "ContentVariables": content_variables,
+            "MessagingServiceSid": messaging_service_sid,
+        }
+        form.update({key: value for key, value in optional_fields.items() if value is not None})
+
+        session = await self._get_session()
+        start = time.perf_counter()
+        try:
+            async with session.post(self._messages_url(account_sid), data=form, auth=auth) as response:
+                payload = await self._read_payload(response)
+                if response.status >= 400:
+                    TWILIO_REQUEST_SECONDS.observe(time.perf_counter() - start, "error")
+                    TWILIO_ERRORS.inc(str(response.status))
+                    raise TwilioTransportError(
+                        (payload or {}).get("message", f"Twilio returned HTTP {response.status}"),
+                        status=response.status,
+                        code=(payload or {}).get("code"),
+                    )
+                if not payload or "sid" not in payload:
+                    TWILIO_REQUEST_SECONDS.observe(time.perf_counter() - start, "error")
+                    TWILIO_ERRORS.inc("invalid_response")
+                    raise TwilioTransportError(
+                        f"Twilio returned HTTP {response.status} without a message sid", status=response.status
+                    )
+                TWILIO_REQUEST_SECONDS.observe(time.perf_counter() - start, "success")
+                return TwilioMessage(sid=payload["sid"], status=payload.get("status"))
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            TWILIO_REQUEST_SECONDS.observe(time.perf_counter() - start, "error")
+            TWILIO_ERRORS.inc("timeout" if isinstance(e, asyncio.TimeoutError) else "network")
+            raise TwilioTransportError(f"Twilio request failed: {e!r}") from e
+
+    @staticmethod
+    async def _read_payload(response: aiohttp.ClientResponse) -> Optional[dict]:
+        """Decoded JSON object body, or None for an empty or non-JSON body (e.g. a proxy's HTML 502)."""
+        try:
+            payload = await response.json(content_type=None)
+        except ValueError:
+            return None
+        return payload if isinstance(payload, dict) else None
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logger.info("Closed Twilio connection pool")
+        self._session = None
+
+
+twilio_transport = TwilioTransport.from_env()
+
+
+def _apply_credentials(old: Settings, new: Settings):
+    if (old.twilio_account_sid, old.twilio_auth_token) != (new.twilio_account_sid, new.twilio_auth_token):
+        twilio_transport.set_credentials(new.twilio_account_sid, new.twilio_auth_token)
+        logger.info("Twilio credentials changed; applied to the transport")
+
+
+config_store.subscribe(_apply_credentials)
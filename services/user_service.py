@@ -1,75 +1,60 @@
 from sqlalchemy.orm import Session
-from models.database import User, UserReply, DecisionTreeQuestion
-import requests
-from twilio.rest import Client
+from sqlalchemy import select, delete, or_, and_
+from models.database import User, UserReply, DecisionTreeQuestion, SessionLocal
+import base64
+import anyio
 import os
 import json
 import logging
 from datetime import datetime, timezone  # Added for timestamp
+from typing import Dict, Iterator, List, Optional, Tuple
 from services.session_manager import session_manager  # Import session manager
+from services.ttl_cache import TTLCache
+from services.recaptcha_verifier import recaptcha_verifier
+from services.outbox import OutboxMessage, outbox
+from services.config_service import get_advisor_messaging
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
 user_sessions = {}
 
-# Twilio client initialization (moved outside functions for reuse)
-account_sid = os.getenv("TWILIO_ACCOUNT_SID")
-auth_token = os.getenv("TWILIO_AUTH_TOKEN")
-try:
-    client = Client(account_sid, auth_token)
-    logger.info("Twilio client initialized successfully")
-except Exception as e:
-    logger.error(f"Failed to initialize Twilio client: {str(e)}")
-    client = None  # Fallback, though you might want to handle this differently
-
-def verify_recaptcha(token: str) -> bool:
+def verify_recaptcha(token: str, context: str = "") -> bool:
     """
     Verify reCAPTCHA token with Google's API.
     Returns True if valid, False otherwise.
     """
     try:
-        secret_key = os.getenv("CAPTCHA_SECRET_KEY")
-        url = os.getenv("CAPTCHA_URL")
-        if not secret_key or not url:
-            logger.error("reCAPTCHA configuration missing: secret_key or url not set")
-            return False
-
         logger.info("Verifying reCAPTCHA token")
-        payload = {'secret': secret_key, 'response': token}
-        response = requests.post(url, data=payload, timeout=5)
-        response.raise_for_status()
-        result = response.json().get("success", False)
-        logger.info(f"reCAPTCHA verification result: {result}")
-        return result
-    except requests.RequestException as e:
-        logger.error(f"reCAPTCHA verification failed due to network error: {str(e)}")
-        return False
+        # Sync route: verify on the event loop's shared connection pool
+        return anyio.from_thread.run(recaptcha_verifier.verify, token, context)
     except Exception as e:
-        logger.error(f"Unexpected error in reCAPTCHA verification: {str(e)}")
+        logger.error("Unexpected error in reCAPTCHA verification: %s", e)
         return False
 
 def submit_form(db: Session, data: dict):
     """
-    Submit user form, create user if new with a timestamp, send WhatsApp message, and update session.
+    Submit user form, create user if new with a timestamp, queue the WhatsApp message, and update session.
     Returns tuple (success_response, error_message).
     """
     try:
         logger.info("Processing form submission")
         # Verify reCAPTCHA
-        if not verify_recaptcha(data["recaptcha_token"]):
+        # A cached verdict only covers a retry of this exact submission
+        form = {key: value for key, value in data.items() if key != "recaptcha_token"}
+        if not verify_recaptcha(data["recaptcha_token"], json.dumps(form, sort_keys=True, default=str)):
             logger.warning("Invalid reCAPTCHA token provided")
             return None, "Invalid reCAPTCHA"
 
         # Check for existing user
-        logger.info(f"Checking for existing user with mobile: {data['mobile_number']}")
+        logger.info("Checking for existing user with mobile: %s", data['mobile_number'])
         existing_user = db.query(User).filter(
             User.mobile_number == data["mobile_number"],
             User.advisor_id == data["advisor_id"]
         ).first()
 
         if existing_user:
-            logger.info(f"User already exists: {existing_user.mobile_number}")
+            logger.info("User already exists: %s", existing_user.mobile_number)
             session_manager.set_session(data["mobile_number"], {
                 "name": existing_user.name,
                 "mobile_number": existing_user.mobile_number,
@@ -96,7 +81,7 @@ def submit_form(db: Session, data: dict):
         db.add(new_user)
         db.commit()
         db.refresh(new_user)
-        logger.info(f"New user created with ID: {new_user.id} at {current_time.isoformat()}")
+        logger.info("New user created with ID: %s at %s", new_user.id, current_time.isoformat())
 
         # Update user session with timestamp
         session_manager.set_session(data["mobile_number"], {
@@ -110,36 +95,44 @@ def submit_form(db: Session, data: dict):
         })
 
         # Send WhatsApp message
-        if not client:
-            logger.error("Twilio client not initialized, skipping WhatsApp message")
-            return {"message": "User created, but message not sent", "created_at": new_user.created_at.isoformat()}, None
-
-        content_sid = os.getenv("FIRST_CONTENT_SID")
-        from_number = os.getenv("TWILIO_PHONE_NUMBER")
-        if not content_sid or not from_number:
-            logger.error("Twilio configuration missing: content_sid or from_number not set")
-            return {"message": "User created, but message not sent", "created_at": new_user.created_at.isoformat()}, None
-
-        logger.info(f"Sending WhatsApp message to: {data['mobile_number']}")
-        message = client.messages.create(
-            content_sid=content_sid,
-            from_=f"whatsapp:{from_number}",
-            content_variables=json.dumps({"1": f"{data['salutation']} {data['first_name']}"}),
-            to=f"whatsapp:{data['mobile_number']}",
-        )
-        logger.info(f"WhatsApp message sent with SID: {message.sid}")
+        # The advisor's own welcome template, falling back to the global one (cached, no disk I/O)
+        messaging = get_advisor_messaging(db, new_user.advisor_id)
+        content_sid = messaging.first_content_sid
+        from_number = messaging.from_number
+        queued = bool(content_sid and from_number)
+        if not queued:
+            logger.error("Twilio configuration missing for advisor %s: content_sid or from_number not set", new_user.advisor_id)
+        else:
+            # The outbox delivers (and retries) after the commit; the response does not wait on Twilio
+            logger.info("Queueing WhatsApp message to: %s", data['mobile_number'])
+            queued = outbox.enqueue(OutboxMessage(
+                kind="welcome",
+                content_sid=content_sid,
+                from_=f"whatsapp:{from_number}",
+                messaging_service_sid=messaging.messaging_service_sid,
+                content_variables=json.dumps({"1": f"{data['salutation']} {data['first_name']}"}),
+                to=f"whatsapp:{data['mobile_number']}",
+            ))
+        if not queued:
+            return {
+                "success": True,
+                "message_sid": None,
+                "message": "User created, but message not sent",
+                "timestamp": new_user.created_at.isoformat()
+            }, None
+
         return {
             "success": True,
-            "message_sid": message.sid,
+            "message_sid": None,
             "message": "Thanks for filling out the form...",
             "timestamp": new_user.created_at.isoformat()  # Include timestamp in response
         }, None
 
     except KeyError as e:
-        logger.error(f"Missing required field in form data: {str(e)}")
+        logger.error("Missing required field in form data: %s", e)
         return None, f"Missing required field: {str(e)}"
     except Exception as e:
-        logger.error(f"Error processing form submission: {str(e)}")
+        logger.error("Error processing form submission: %s", e)
         db.rollback()  # Roll back on error to avoid partial commits
         return None, "Internal server error"
 
@@ -148,32 +141,182 @@ def get_users(db: Session, advisor_id: int):
     Retrieve all users for a given advisor.
     """
     try:
-        logger.info(f"Fetching users for advisor_id: {advisor_id}")
+        logger.info("Fetching users for advisor_id: %s", advisor_id)
         users = db.query(User).filter_by(advisor_id=advisor_id).all()
-        logger.info(f"Found {len(users)} users for advisor_id: {advisor_id}")
+        logger.info("Found %s users for advisor_id: %s", len(users), advisor_id)
         return users  # `created_at` will be included in each User object if accessed
     except Exception as e:
-        logger.error(f"Error fetching users for advisor_id {advisor_id}: {str(e)}")
+        logger.error("Error fetching users for advisor_id %s: %s", advisor_id, e)
         return []
 
-def get_user_replies(db: Session, advisor_id: int, user_id: int):
+USERS_PAGE_DEFAULT_LIMIT = 100
+USERS_PAGE_MAX_LIMIT = 500
+USERS_STREAM_BATCH_SIZE = 1000
+
+# Columns served by the listing endpoints, in UserResponse field order
+USER_LISTING_COLUMNS = (
+    User.id, User.salutation, User.name, User.mobile_number,
+    User.email, User.advisor_id, User.age_group, User.created_at,
+)
+
+def encode_users_cursor(created_at: datetime, user_id: int) -> str:
+    """Opaque keyset cursor pointing just after (created_at, id)."""
+    raw = f"{created_at.isoformat()}|{user_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_users_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of encode_users_cursor; raises ValueError for malformed cursors."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, user_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(user_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+def get_users_page(db: Session, advisor_id: int, limit: int = USERS_PAGE_DEFAULT_LIMIT,
+                   cursor: Optional[str] = None) -> Tuple[List, Optional[str]]:
+    """
+    One page of an advisor's users ordered by (created_at, id), plus the
+    cursor for the next page (None on the last page). Seeks past the cursor
+    instead of using OFFSET, so every page costs the same.
+    """
+    limit = max(1, min(limit, USERS_PAGE_MAX_LIMIT))
+    logger.info("Fetching users page for advisor_id: %s, limit: %s", advisor_id, limit)
+    stmt = select(*USER_LISTING_COLUMNS).where(User.advisor_id == advisor_id)
+    if cursor:
+        after_created_at, after_id = decode_users_cursor(cursor)
+        stmt = stmt.where(or_(
+            User.created_at > after_created_at,
+            and_(User.created_at == after_created_at, User.id > after_id),
+        ))
+    rows = db.execute(stmt.order_by(User.created_at, User.id).limit(limit + 1)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_users_cursor(rows[-1].created_at, rows[-1].id)
+    return rows, next_cursor
+
+def iter_users_ndjson(advisor_id: int, batch_size: int = USERS_STREAM_BATCH_SIZE) -> Iterator[str]:
     """
-    Retrieve user replies joined with decision tree questions for a given advisor and user.
+    Yield an advisor's users as NDJSON lines straight from a server-side
+    cursor over a column-only query; no ORM objects are built. Opens its own
+    session because the response body outlives the request's dependencies.
     """
+    logger.info("Streaming users for advisor_id: %s", advisor_id)
+    keys = [column.key for column in USER_LISTING_COLUMNS]
+    stmt = (
+        select(*USER_LISTING_COLUMNS)
+        .where(User.advisor_id == advisor_id)
+        .order_by(User.created_at, User.id)
+        .execution_options(yield_per=batch_size)
+    )
+    db = SessionLocal()
     try:
-        logger.info(f"Fetching replies for user_id: {user_id}, advisor_id: {advisor_id}")
-        replies = db.query(UserReply).join(DecisionTreeQuestion).filter(
-            UserReply.user_id == user_id,
-            DecisionTreeQuestion.advisor_id == advisor_id
-        ).all()
-        replies_dict = {reply.question_id: reply.reply for reply in replies}
-        
-        questions = db.query(DecisionTreeQuestion).filter_by(advisor_id=advisor_id).all()
-        result = [{"question": q.question, "reply": replies_dict[q.id]} 
-                 for q in questions if q.id in replies_dict]
-        
-        logger.info(f"Found {len(result)} replies for user_id: {user_id}")
+        count = 0
+        for partition in db.execute(stmt).partitions():
+            lines = []
+            for row in partition:
+                record = dict(zip(keys, row))
+                record["created_at"] = record["created_at"].isoformat() if record["created_at"] else None
+                lines.append(json.dumps(record))
+            count += len(lines)
+            yield "\n".join(lines) + "\n"
+        logger.info("Streamed %s users for advisor_id: %s", count, advisor_id)
+    finally:
+        db.close()
+
+# Per-user reply cache keyed by (advisor_id, user_id). The webhook and the
+# reply writer invalidate an entry when they store a reply for that user.
+reply_cache = TTLCache(maxsize=int(os.getenv("REPLY_CACHE_SIZE", 10000)), ttl=int(os.getenv("REPLY_CACHE_TTL", 60)))
+
+def _replies_query(advisor_id: int, user_ids: List[int]):
+    return (
+        select(
+            UserReply.user_id,
+            DecisionTreeQuestion.step,
+            DecisionTreeQuestion.question,
+            UserReply.reply,
+            UserReply.created_at,
+        )
+        .join(DecisionTreeQuestion, UserReply.question_id == DecisionTreeQuestion.id)
+        .where(UserReply.user_id.in_(user_ids), DecisionTreeQuestion.advisor_id == advisor_id)
+        .order_by(UserReply.user_id, DecisionTreeQuestion.step, UserReply.created_at, UserReply.id)
+    )
+
+def _group_replies(rows) -> Dict[int, List[dict]]:
+    """Group rows by user in step order, keeping the latest reply per step."""
+    grouped: Dict[int, Dict[int, dict]] = {}
+    for row in rows:
+        grouped.setdefault(row.user_id, {})[row.step] = {
+            "step": row.step,
+            "question": row.question,
+            "reply": row.reply,
+            "created_at": row.created_at,
+        }
+    return {user_id: list(by_step.values()) for user_id, by_step in grouped.items()}
+
+def get_users_replies(db: Session, advisor_id: int, user_ids: List[int]) -> Dict[int, List[dict]]:
+    """
+    Retrieve replies for many users of an advisor in one query, serving
+    cached users from reply_cache. Users without replies map to [].
+    """
+    try:
+        result = {}
+        missing = []
+        for user_id in dict.fromkeys(user_ids):
+            cached = reply_cache.get((advisor_id, user_id))
+            if cached is None:
+                missing.append(user_id)
+            else:
+                result[user_id] = list(cached)
+
+        if missing:
+            logger.info("Fetching replies for %s users, advisor_id: %s", len(missing), advisor_id)
+            fetched = _group_replies(db.execute(_replies_query(advisor_id, missing)))
+            for user_id in missing:
+                replies = fetched.get(user_id, [])
+                reply_cache.set((advisor_id, user_id), tuple(replies))
+                result[user_id] = replies
         return result
     except Exception as e:
-        logger.error(f"Error fetching replies for user_id {user_id}, advisor_id {advisor_id}: {str(e)}")
-        return []
+        logger.error("Error fetching replies for user_ids %s, advisor_id %s: %s", user_ids, advisor_id, e)
+        return {}
+
+def get_user_replies(db: Session, advisor_id: int, user_id: int):
+    """
+    Retrieve a user's replies with their question text, in step order,
+    using a single projection query over user_replies joined to questions.
+    """
+    logger.info("Fetching replies for user_id: %s, advisor_id: %s", user_id, advisor_id)
+    result = get_users_replies(db, advisor_id, [user_id]).get(user_id, [])
+    logger.info("Found %s replies for user_id: %s", len(result), user_id)
+    return result
+
+def delete_user(db: Session, user_id: int, advisor_id: int):
+    """
+    Delete one of an advisor's users together with their replies and chat
+    session. Returns (result, None) or (None, error).
+    """
+    try:
+        logger.info("Deleting user_id: %s for advisor_id: %s", user_id, advisor_id)
+        user = db.query(User).filter_by(id=user_id, advisor_id=advisor_id).first()
+        if user is None:
+            logger.warning("User %s not found for advisor_id: %s", user_id, advisor_id)
+            return None, "User not found"
+
+        deleted_replies = db.execute(delete(UserReply).where(UserReply.user_id == user_id)).rowcount
+        db.delete(user)
+        db.commit()
+        reply_cache.invalidate((advisor_id, user_id))
+        session_manager.clear_session(user.mobile_number)
+        logger.info("Deleted user_id: %s and %s replies", user_id, deleted_replies)
+        return {
+            "success": True,
+            "message": "User deleted",
+            "user_id": user_id,
+            "deleted_replies": deleted_replies,
+        }, None
+    except Exception as e:
+        logger.error("Error deleting user_id %s for advisor_id %s: %s", user_id, advisor_id, e)
+        db.rollback()
+        return None, "Internal server error"